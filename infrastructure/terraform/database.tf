@@ -51,6 +51,18 @@ resource "aws_rds_cluster_instance" "whoosh" {
   tags = local.tags
 }
 
+# Readers serve the Django API's replica reads (cluster reader endpoint)
+resource "aws_rds_cluster_instance" "whoosh_reader" {
+  count              = var.aurora_reader_count
+  identifier         = "${local.name}-aurora-reader-${count.index + 1}"
+  cluster_identifier = aws_rds_cluster.whoosh.id
+  instance_class     = "db.serverless"
+  engine             = aws_rds_cluster.whoosh.engine
+  engine_version     = aws_rds_cluster.whoosh.engine_version
+
+  tags = local.tags
+}
+
 resource "aws_db_subnet_group" "whoosh" {
   name       = "${local.name}-db-subnet-group"
   subnet_ids = module.vpc.private_subnets
@@ -28,3 +28,12 @@ output "oidc_provider_arn" {
   value       = module.eks.oidc_provider_arn
 }
 
+output "aurora_endpoint" {
+  description = "Aurora writer endpoint"
+  value       = aws_rds_cluster.whoosh.endpoint
+}
+
+output "aurora_reader_endpoint" {
+  description = "Aurora reader endpoint"
+  value       = aws_rds_cluster.whoosh.reader_endpoint
+}
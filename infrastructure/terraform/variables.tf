@@ -58,6 +58,12 @@ variable "aurora_max_capacity" {
   default     = 128
 }
 
+variable "aurora_reader_count" {
+  description = "Number of Aurora reader instances behind the reader endpoint"
+  type        = number
+  default     = 1
+}
+
 variable "redis_node_type" {
   description = "ElastiCache Redis node type"
   type        = string
@@ -0,0 +1,198 @@
+"""
+JWT signing and verification keys.
+
+Keys are read from AWS Secrets Manager as PEM. ``private_key`` signs every
+token. Its public half, plus any ``previous_public_keys`` kept from earlier
+rotations, verify. Each key is named by its RFC 7638 thumbprint (``kid``).
+Tokens carry the ``kid`` in their header and ``/.well-known/jwks.json``
+publishes the public keys under it, so other services verify tokens
+themselves and only refetch the key set when they meet an unknown ``kid``.
+
+PEMs are parsed once per process: parsing an RSA private key costs tens of
+milliseconds, which simplejwt's stock backend paid on every token it signed.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from rest_framework_simplejwt import state
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+_keyring = None
+
+
+def get_jwt_keys_from_secrets_manager():
+    """
+    Return ``(private_pem, previous_public_pems)`` from AWS Secrets Manager.
+
+    With ``JWT_DEV_KEYS`` on (local development) a failed fetch falls back to
+    a key pair kept in ``JWT_DEV_KEY_FILE``, so every worker signs with the
+    same key. Otherwise the error is raised: a pod signing with a key of its
+    own would publish it in its JWKS and break verification for every pod.
+    """
+    # boto3/botocore take a large share of worker import time and are only
+    # needed here, so they are imported on first use.
+    import boto3
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    try:
+        client = boto3.client('secretsmanager', region_name=settings.AWS_REGION)
+        response = client.get_secret_value(SecretId=settings.AWS_SECRETS_MANAGER_SECRET_NAME)
+        secret = json.loads(response['SecretString'])
+        return secret['private_key'], secret.get('previous_public_keys', [])
+    except (BotoCoreError, ClientError):
+        if not settings.JWT_DEV_KEYS:
+            raise
+        logger.warning('JWT keys unavailable from Secrets Manager, using %s', settings.JWT_DEV_KEY_FILE)
+        return _dev_private_key(settings.JWT_DEV_KEY_FILE), []
+
+
+def _dev_private_key(path):
+    """Read the local development key, creating it if no process has yet."""
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    private_pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode()
+    # Write aside and link into place, so a concurrent worker either wins the
+    # race or reads a complete file
+    temp_path = f'{path}.{os.getpid()}'
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(private_pem)
+    try:
+        os.link(temp_path, path)
+    except FileExistsError:
+        with open(path) as f:
+            private_pem = f.read()
+    finally:
+        os.unlink(temp_path)
+    return private_pem
+
+
+def _b64url(value):
+    return base64.urlsafe_b64encode(value).rstrip(b'=').decode()
+
+
+def public_jwk(public_key):
+    """The public JWK of an RSA key, ``kid`` included."""
+    numbers = public_key.public_numbers()
+    jwk = {
+        'e': _b64url(numbers.e.to_bytes((numbers.e.bit_length() + 7) // 8, 'big')),
+        'kty': 'RSA',
+        'n': _b64url(numbers.n.to_bytes((numbers.n.bit_length() + 7) // 8, 'big')),
+    }
+    # RFC 7638 thumbprint: SHA-256 of the required members, sorted, no whitespace
+    canonical = json.dumps(jwk, sort_keys=True, separators=(',', ':')).encode()
+    return {**jwk, 'kid': _b64url(hashlib.sha256(canonical).digest()), 'use': 'sig', 'alg': 'RS256'}
+
+
+class KeyRing:
+    """
+    Parsed keys of one process: the signing key and every verifying key by
+    ``kid``, with the JWKS document (current key first) and its ETag.
+    """
+
+    def __init__(self, private_pem, previous_public_pems=()):
+        self.signing_key = serialization.load_pem_private_key(private_pem.encode(), password=None)
+        public_keys = [self.signing_key.public_key()] + [
+            serialization.load_pem_public_key(pem.encode()) for pem in previous_public_pems
+        ]
+        jwks = [public_jwk(key) for key in public_keys]
+
+        self.kid = jwks[0]['kid']
+        self.verifying_keys = {jwk['kid']: key for jwk, key in zip(jwks, public_keys)}
+        self.public_pem = public_keys[0].public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        self.jwks = json.dumps({'keys': jwks}, separators=(',', ':')).encode()
+        self.etag = f'"{hashlib.sha256(self.jwks).hexdigest()[:32]}"'
+
+
+class KeyedTokenBackend(TokenBackend):
+    """
+    simplejwt token backend on a ``KeyRing``.
+
+    Signs with the parsed current key and stamps its ``kid`` in the header;
+    verifies with the key the token's ``kid`` names. Tokens without a ``kid``
+    (signed before key ids existed) are checked against the current key.
+    """
+
+    def __init__(self, keyring):
+        super().__init__(
+            api_settings.ALGORITHM,
+            keyring.signing_key,
+            keyring.verifying_keys[keyring.kid],
+            api_settings.AUDIENCE,
+            api_settings.ISSUER,
+            None,
+            api_settings.LEEWAY,
+            api_settings.JSON_ENCODER,
+        )
+        self.keyring = keyring
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(
+            jwt_payload,
+            self.signing_key,
+            algorithm=self.algorithm,
+            headers={'kid': self.keyring.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def get_verifying_key(self, token):
+        # Called inside decode()'s error handling: InvalidTokenError becomes
+        # the usual TokenBackendError
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is None:
+            return self.verifying_key
+        try:
+            return self.keyring.verifying_keys[kid]
+        except KeyError:
+            raise jwt.InvalidTokenError(f'Unknown key id {kid!r}')
+
+
+def configure_jwt_keys():
+    """
+    Load the JWT keys and install the keyed token backend.
+
+    Keys are fetched once per process; later calls are no-ops. gunicorn calls
+    this in the master before forking workers (see ``when_ready`` in
+    ``gunicorn.conf.py``), so requests never wait on Secrets Manager.
+    """
+    global _keyring
+    if _keyring is not None:
+        return
+    private_pem, previous_public_pems = get_jwt_keys_from_secrets_manager()
+    keyring = KeyRing(private_pem, previous_public_pems)
+    settings.SIMPLE_JWT['SIGNING_KEY'] = private_pem
+    settings.SIMPLE_JWT['VERIFYING_KEY'] = keyring.public_pem
+    # Token classes look the backend up here every time they are instantiated
+    state.token_backend = KeyedTokenBackend(keyring)
+    _keyring = keyring
+
+
+def get_keyring():
+    """The process's ``KeyRing``, loading it on first use."""
+    configure_jwt_keys()
+    return _keyring
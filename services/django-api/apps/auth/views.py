@@ -1,53 +1,63 @@
 """
 Authentication views for JWT-based auth.
 """
-import boto3
-import json
 import uuid
 from datetime import timedelta, datetime
-from botocore.exceptions import ClientError
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
 from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from apps.users.cache import invalidate_public_profiles
+from whoosh_api.db_router import pin_to_writer
+from .keys import configure_jwt_keys, get_keyring
 
 User = get_user_model()
 
 
-def get_jwt_keys_from_secrets_manager():
-    """Retrieve JWT RSA keys from AWS Secrets Manager."""
-    try:
-        client = boto3.client('secretsmanager', region_name=settings.AWS_REGION)
-        response = client.get_secret_value(SecretId=settings.AWS_SECRETS_MANAGER_SECRET_NAME)
-        secret = json.loads(response['SecretString'])
-        return secret.get('private_key'), secret.get('public_key')
-    except ClientError:
-        # Fallback for local development - generate keys on the fly
-        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-        private_pem = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        public_pem = private_key.public_key().public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        return private_pem.decode(), public_pem.decode()
+def issue_tokens(user):
+    """Create a refresh/access token pair carrying the Whoosh custom claims."""
+    refresh_token = RefreshToken.for_user(user)
+    access_token = refresh_token.access_token
+    
+    for token in (refresh_token, access_token):
+        token['user_id'] = str(user.id)
+        token['username'] = user.username
+        token['is_guest'] = user.is_guest
+        if user.display_name:
+            token['display_name'] = user.display_name
+    
+    # Guest tokens expire with the guest session (24 hours)
+    if user.is_guest:
+        from rest_framework_simplejwt.utils import aware_utcnow
+        refresh_token.set_exp(from_time=aware_utcnow(), lifetime=timedelta(hours=24))
+        access_token.set_exp(from_time=aware_utcnow(), lifetime=timedelta(hours=24))
+    
+    return refresh_token, access_token
 
 
-def configure_jwt_keys():
-    """Configure JWT keys in settings."""
-    private_key, public_key = get_jwt_keys_from_secrets_manager()
-    settings.SIMPLE_JWT['SIGNING_KEY'] = private_key
-    settings.SIMPLE_JWT['VERIFYING_KEY'] = public_key
+def token_response_data(user, refresh_token, access_token, include_email=True):
+    """Response body shared by every endpoint that hands out tokens."""
+    user_data = {
+        'id': user.id,
+        'username': user.username,
+    }
+    if include_email:
+        user_data['email'] = user.email
+    user_data['display_name'] = user.display_name
+    user_data['is_guest'] = user.is_guest
+    return {
+        'refresh': str(refresh_token),
+        'access': str(access_token),
+        'user': user_data,
+    }
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -73,6 +83,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 @permission_classes([AllowAny])
 def register(request):
     """Register a new user."""
+    configure_jwt_keys()  # Ensure keys are loaded
+    
     username = request.data.get('username')
     email = request.data.get('email')
     password = request.data.get('password')
@@ -100,29 +112,15 @@ def register(request):
         email=email,
         password=password
     )
+    # The new account must be readable on the next request, even before replication
+    pin_to_writer([user.id])
 
-    refresh_token = RefreshToken.for_user(user)
-    access_token = refresh_token.access_token
-    
-    # Add custom claims
-    refresh_token['user_id'] = str(user.id)
-    refresh_token['username'] = user.username
-    refresh_token['is_guest'] = user.is_guest
-    access_token['user_id'] = str(user.id)
-    access_token['username'] = user.username
-    access_token['is_guest'] = user.is_guest
+    refresh_token, access_token = issue_tokens(user)
     
-    return Response({
-        'refresh': str(refresh_token),
-        'access': str(access_token),
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'display_name': user.display_name,
-            'is_guest': user.is_guest,
-        }
-    }, status=status.HTTP_201_CREATED)
+    return Response(
+        token_response_data(user, refresh_token, access_token),
+        status=status.HTTP_201_CREATED
+    )
 
 
 @api_view(['POST'])
@@ -154,31 +152,12 @@ def login(request):
         )
 
     # Generate tokens with custom claims
-    refresh_token = RefreshToken.for_user(user)
-    access_token = refresh_token.access_token
+    refresh_token, access_token = issue_tokens(user)
     
-    refresh_token['user_id'] = str(user.id)
-    refresh_token['username'] = user.username
-    refresh_token['is_guest'] = user.is_guest
-    access_token['user_id'] = str(user.id)
-    access_token['username'] = user.username
-    access_token['is_guest'] = user.is_guest
-    
-    if user.display_name:
-        refresh_token['display_name'] = user.display_name
-        access_token['display_name'] = user.display_name
-    
-    return Response({
-        'refresh': str(refresh_token),
-        'access': str(access_token),
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'display_name': user.display_name,
-            'is_guest': user.is_guest,
-        }
-    }, status=status.HTTP_200_OK)
+    return Response(
+        token_response_data(user, refresh_token, access_token),
+        status=status.HTTP_200_OK
+    )
 
 
 @api_view(['POST'])
@@ -207,41 +186,15 @@ def create_guest(request):
         display_name=display_name if display_name else None,
         session_expires_at=timezone.now() + timedelta(hours=24)
     )
+    pin_to_writer([user.id])
     
-    # Generate JWT tokens with shorter expiration for guests
-    # For guests, we need custom token expiration (24 hours)
-    from rest_framework_simplejwt.utils import aware_utcnow
-    
-    refresh_token = RefreshToken.for_user(user)
-    access_token = refresh_token.access_token
-    
-    # Add custom claims
-    refresh_token['user_id'] = str(user.id)
-    refresh_token['username'] = user.username
-    refresh_token['is_guest'] = user.is_guest
-    access_token['user_id'] = str(user.id)
-    access_token['username'] = user.username
-    access_token['is_guest'] = user.is_guest
-    
-    if user.display_name:
-        refresh_token['display_name'] = user.display_name
-        access_token['display_name'] = user.display_name
-    
-    # Set 24-hour expiration for guest tokens
-    if user.is_guest:
-        refresh_token.set_exp(from_time=aware_utcnow(), lifetime=timedelta(hours=24))
-        access_token.set_exp(from_time=aware_utcnow(), lifetime=timedelta(hours=24))
+    # Generate JWT tokens with shorter expiration for guests (24 hours)
+    refresh_token, access_token = issue_tokens(user)
     
-    return Response({
-        'refresh': str(refresh_token),
-        'access': str(access_token),
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'display_name': user.display_name,
-            'is_guest': user.is_guest,
-        }
-    }, status=status.HTTP_201_CREATED)
+    return Response(
+        token_response_data(user, refresh_token, access_token, include_email=False),
+        status=status.HTTP_201_CREATED
+    )
 
 
 @api_view(['POST'])
@@ -298,34 +251,16 @@ def convert_guest(request):
     user.session_expires_at = None
     # Keep display_name if it was set
     user.save()
+    pin_to_writer([user.id])
+    invalidate_public_profiles([user.id])
     
     # Generate new tokens with full expiration (default settings)
-    refresh_token = RefreshToken.for_user(user)
-    access_token = refresh_token.access_token
-    
-    # Add custom claims
-    refresh_token['user_id'] = str(user.id)
-    refresh_token['username'] = user.username
-    refresh_token['is_guest'] = user.is_guest
-    access_token['user_id'] = str(user.id)
-    access_token['username'] = user.username
-    access_token['is_guest'] = user.is_guest
-    
-    if user.display_name:
-        refresh_token['display_name'] = user.display_name
-        access_token['display_name'] = user.display_name
+    refresh_token, access_token = issue_tokens(user)
     
-    return Response({
-        'refresh': str(refresh_token),
-        'access': str(access_token),
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'display_name': user.display_name,
-            'is_guest': user.is_guest,
-        }
-    }, status=status.HTTP_200_OK)
+    return Response(
+        token_response_data(user, refresh_token, access_token),
+        status=status.HTTP_200_OK
+    )
 
 
 @api_view(['GET'])
@@ -333,3 +268,18 @@ def convert_guest(request):
 def health_check(request):
     """Health check endpoint."""
     return Response({'status': 'ok'}, status=status.HTTP_200_OK)
+
+
+@cache_control(public=True, max_age=settings.JWKS_MAX_AGE)
+@condition(etag_func=lambda request: get_keyring().etag)
+@require_safe
+def jwks(request):
+    """
+    Public keys that verify our JWTs, as a JWK Set keyed by ``kid``.
+
+    A plain Django view: the document is fixed per process, so it is served
+    as pre-rendered bytes with an ETag (``If-None-Match`` gets a 304) and a
+    long ``Cache-Control``. Verifiers refetch when a token names an unknown
+    ``kid``.
+    """
+    return HttpResponse(get_keyring().jwks, content_type='application/json')
@@ -0,0 +1,103 @@
+"""
+Admin building blocks for tables with millions of rows.
+
+The stock changelist runs an exact ``COUNT(*)`` (twice when filtered), an
+unindexed ``icontains`` search over every search field and ``delete_selected``
+loads every selected object before deleting it. ``LargeTableAdmin`` replaces
+those with estimated counts, indexed searches and batched SQL.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model, using='default'):
+    """
+    The planner's row estimate for ``model``'s table from ``pg_class.reltuples``,
+    or ``None`` if the table has never been analyzed.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never counts a large table exactly.
+
+    An unfiltered changelist takes the estimate from ``pg_class``; a filtered or
+    searched one counts at most ``ADMIN_COUNT_LIMIT`` rows, so its page links
+    stop there. Small tables (estimate below the limit) are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+
+def in_batches(queryset, batch_size=None):
+    """
+    Yield the primary keys of ``queryset`` in lists of ``batch_size``.
+
+    Walks the primary key index in keyset order, so each batch is one short
+    indexed query however many rows were selected.
+    """
+    batch_size = batch_size or settings.ADMIN_ACTION_BATCH_SIZE
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(batch[:batch_size])
+        if not pks:
+            return
+        yield pks
+        if len(pks) < batch_size:
+            return
+        last_pk = pks[-1]
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ``ModelAdmin`` defaults for large tables.
+
+    Subclasses should only use ``^field`` (prefix) search fields backed by an
+    index, order by an indexed column and list it in ``sortable_by``. A search
+    term that parses as a primary key also matches that row. The row-by-row
+    ``delete_selected`` action is removed; provide a batched one instead.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        search_term = search_term.strip()
+        if search_term:
+            try:
+                pk = self.model._meta.pk.to_python(search_term)
+            except ValidationError:
+                pass
+            else:
+                results |= queryset.filter(pk=pk)
+        return results, may_have_duplicates
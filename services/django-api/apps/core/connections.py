@@ -0,0 +1,38 @@
+"""
+Database connection budget helpers shared by the stats endpoint and ``db_budget``.
+"""
+import os
+from django.conf import settings
+
+
+def server_layout():
+    """
+    ``(workers, threads)`` per pod, read from the same environment variables
+    and defaults as ``gunicorn.conf.py``.
+    """
+    workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+    threads = int(os.getenv('GUNICORN_THREADS', '2'))
+    return workers, threads
+
+
+def connections_per_worker(threads=None, server_mode=None, pool_max_size=None, aliases=None,
+                           max_concurrency=None):
+    """
+    Upper bound on Postgres connections one worker process can hold, across
+    all ``aliases`` (default: every configured database, so the replica counts
+    when there is one).
+
+    Per alias it is the pool size with a pool. Otherwise every thread that runs
+    views holds its own connection: each gthread thread in WSGI mode, and in
+    ASGI mode each request in flight, up to ``ASGI_MAX_CONCURRENCY``, since
+    Django runs every request's sync code on a thread of its own.
+    """
+    pool_max_size = settings.DB_POOL_MAX_SIZE if pool_max_size is None else pool_max_size
+    aliases = len(settings.DATABASES) if aliases is None else aliases
+    if pool_max_size:
+        per_alias = pool_max_size
+    elif (server_mode or settings.SERVER_MODE) == 'asgi':
+        per_alias = settings.ASGI_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+    else:
+        per_alias = server_layout()[1] if threads is None else threads
+    return per_alias * aliases
@@ -0,0 +1,163 @@
+"""
+Streaming bulk export of tables for analytics.
+
+Rows are read with a server-side cursor (``.iterator(chunk_size=...)``) as
+plain tuples and written out chunk by chunk, so memory stays flat whatever
+the table size. Used by the ``export`` management command and the
+``api/export/<table>/`` endpoint.
+"""
+import collections
+import csv
+import datetime
+import zlib
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from apps.game.models import Match, MatchParticipant
+from apps.users.models import User
+from whoosh_api.db_router import REPLICA_DB_ALIAS
+
+Export = collections.namedtuple('Export', ['model', 'fields', 'watermark'])
+
+# Table name -> what to export. ``watermark`` is the timestamp used for
+# incremental exports; participants take theirs from the match.
+EXPORTS = {
+    'users': Export(
+        User,
+        ('id', 'username', 'display_name', 'is_guest', 'elo', 'xp', 'total_games', 'wins',
+         'created_at', 'updated_at', 'session_expires_at'),
+        'updated_at',
+    ),
+    'matches': Export(
+        Match,
+        ('id', 'started_at', 'ended_at', 'status', 'winner_id'),
+        'started_at',
+    ),
+    'match_participants': Export(
+        MatchParticipant,
+        ('id', 'match_id', 'user_id', 'elo_before', 'elo_after', 'xp_gained', 'is_winner'),
+        'match__started_at',
+    ),
+}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def default_database():
+    """The read replica when one is configured, so exports stay off the writer."""
+    return REPLICA_DB_ALIAS if REPLICA_DB_ALIAS in settings.DATABASES else 'default'
+
+
+def export_queryset(table, since=None, until=None, using='default'):
+    """
+    Tuples of ``EXPORTS[table].fields`` with ``since < watermark <= until``.
+
+    Rows are not ordered: sorting a large table would cost the database a full
+    sort, and the watermark window already makes incremental exports line up.
+    """
+    export = EXPORTS[table]
+    queryset = export.model._default_manager.using(using)
+    if since is not None:
+        queryset = queryset.filter(**{f'{export.watermark}__gt': since})
+    if until is not None:
+        queryset = queryset.filter(**{f'{export.watermark}__lte': until})
+    return queryset.order_by().values_list(*export.fields)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object that hands ``csv.writer`` output straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _encode_rows(table, rows, fmt):
+    """Yield one bytes line per row (plus a header line for CSV)."""
+    fields = EXPORTS[table].fields
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields).encode()
+        for row in rows:
+            yield writer.writerow([_csv_value(value) for value in row]).encode()
+    else:
+        for row in rows:
+            yield orjson.dumps(dict(zip(fields, row)), default=str) + b'\n'
+
+
+def stream_export(table, fmt='ndjson', compress=False, since=None, until=None, using='default', chunk_size=None):
+    """
+    Yield the export as bytes chunks of about ``chunk_size`` rows each.
+
+    With ``compress`` the stream is a single gzip member, flushed per chunk so
+    nothing is held back between chunks.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    rows = export_queryset(table, since, until, using).iterator(chunk_size=chunk_size)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    buffer = []
+    for line in _encode_rows(table, rows, fmt):
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            data = b''.join(buffer)
+            buffer.clear()
+            yield compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else data
+    data = b''.join(buffer)
+    yield compressor.compress(data) + compressor.flush() if compressor else data
+
+
+async def astream(chunks):
+    """
+    Async iterator over ``stream_export`` chunks, for ASGI responses.
+
+    Given a sync iterator, Django's ASGI handler drains it into a list before
+    sending anything. Each chunk is instead fetched with its own
+    ``sync_to_async`` call, on the request's thread, where the server-side
+    cursor's connection lives.
+    """
+    fetch = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    try:
+        while (chunk := await fetch(chunks, done)) is not done:
+            yield chunk
+    finally:
+        # Client gone part way: close the cursor now, not at garbage collection
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def default_until():
+    """
+    Default ``until`` watermark: ``EXPORT_WATERMARK_LAG_SECONDS`` ago.
+
+    A row's watermark is set before its transaction commits, and the replica
+    applies the commit later still. Rows stamped in that margin may not be
+    visible yet; stopping short of it leaves them to the next export instead
+    of skipping them for good.
+    """
+    return timezone.now() - datetime.timedelta(seconds=settings.EXPORT_WATERMARK_LAG_SECONDS)
+
+
+def parse_watermark(value):
+    """Parse an ISO 8601 ``since``/``until`` value; naive values are taken as UTC."""
+    parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, datetime.timezone.utc)
+    return parsed
+
+
+def export_filename(table, fmt, compress, until):
+    """``<table>-<until>.<fmt>[.gz]``, e.g. ``users-20240101T000000Z.ndjson.gz``."""
+    stamp = until.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return f'{table}-{stamp}.{fmt}' + ('.gz' if compress else '')
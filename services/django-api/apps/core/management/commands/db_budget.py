@@ -0,0 +1,76 @@
+"""
+Check the fleet-wide Postgres connection budget against the server's limit.
+"""
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.core.connections import connections_per_worker, server_layout
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute how many Postgres connections the API can open at full scale-out '
+        '(pods x workers x connections per worker, plus Celery and reserved '
+        'connections) and fail if it exceeds max_connections. The replica, if any, '
+        'takes as many again against its own max_connections.'
+    )
+
+    def add_arguments(self, parser):
+        workers, threads = server_layout()
+        parser.add_argument('--pods', type=int, default=int(os.getenv('DJANGO_MAX_REPLICAS', '10')),
+                            help='Maximum pod count (HPA maxReplicas, default 10)')
+        parser.add_argument('--workers', type=int, default=workers,
+                            help='Gunicorn workers per pod (default: GUNICORN_WORKERS)')
+        parser.add_argument('--threads', type=int, default=threads,
+                            help='Threads per gthread worker (default: GUNICORN_THREADS)')
+        parser.add_argument('--server-mode', choices=['wsgi', 'asgi'], default=settings.SERVER_MODE)
+        parser.add_argument('--asgi-max-concurrency', type=int, default=settings.ASGI_MAX_CONCURRENCY,
+                            help='Requests in flight per uvicorn worker (default: ASGI_MAX_CONCURRENCY)')
+        parser.add_argument('--pool-max-size', type=int, default=settings.DB_POOL_MAX_SIZE,
+                            help='psycopg pool size per worker; 0 for persistent connections')
+        parser.add_argument('--celery', type=int, default=int(os.getenv('CELERY_DB_CONNECTIONS', '0')),
+                            help='Connections held by Celery workers')
+        parser.add_argument('--reserved', type=int, default=10,
+                            help='Connections kept free for migrations, admin and monitoring')
+        parser.add_argument('--max-connections', type=int,
+                            help='Server max_connections (default: SHOW max_connections)')
+
+    def handle(self, *args, **options):
+        # Per database: the writer and the replica each see this many, each
+        # against its own max_connections
+        per_worker = connections_per_worker(
+            threads=options['threads'],
+            server_mode=options['server_mode'],
+            pool_max_size=options['pool_max_size'],
+            aliases=1,
+            max_concurrency=options['asgi_max_concurrency'],
+        )
+        per_pod = per_worker * options['workers']
+        fleet = per_pod * options['pods'] + options['celery'] + options['reserved']
+
+        max_connections = options['max_connections']
+        if max_connections is None:
+            with connection.cursor() as cursor:
+                cursor.execute('SHOW max_connections')
+                max_connections = int(cursor.fetchone()[0])
+
+        available = max_connections - options['celery'] - options['reserved']
+        max_pods = available // per_pod if per_pod else 0
+
+        replica = ' (the replica takes as many again)' if len(settings.DATABASES) > 1 else ''
+        self.stdout.write(f'Connections per worker: {per_worker}{replica}')
+        self.stdout.write(f'Connections per pod:    {per_pod} ({options["workers"]} workers)')
+        self.stdout.write(
+            f'Fleet total:            {fleet} '
+            f'({options["pods"]} pods, {options["celery"]} Celery, {options["reserved"]} reserved)'
+        )
+        self.stdout.write(f'max_connections:        {max_connections}')
+        self.stdout.write(f'Pods that fit:          {max_pods}')
+
+        if fleet > max_connections:
+            raise CommandError(
+                f'{fleet} connections at {options["pods"]} pods exceeds max_connections={max_connections}; '
+                f'lower --pods to {max_pods}, reduce workers/threads or set DB_POOL_MAX_SIZE'
+            )
+        self.stdout.write(self.style.SUCCESS(f'OK: {max_connections - fleet} connections of headroom'))
@@ -0,0 +1,60 @@
+"""
+Report what a server process imports at start-up and how long it takes.
+"""
+import os
+import subprocess
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Import the WSGI/ASGI application in a fresh interpreter with -X importtime '
+        'and report the slowest imports. Fails when the total exceeds --budget-ms, '
+        'so start-up regressions can be caught in CI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='whoosh_api.wsgi',
+                            help='Module to import (default: whoosh_api.wsgi)')
+        parser.add_argument('--top', type=int, default=20,
+                            help='Number of slowest packages to list')
+        parser.add_argument('--budget-ms', type=float,
+                            help='Fail if the total import time exceeds this many milliseconds')
+        parser.add_argument('--forbid', action='append', default=[],
+                            help='Top-level package that must not be imported at start-up '
+                                 '(e.g. --forbid boto3 --forbid celery); may be repeated')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'whoosh_api.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {options["module"]}'],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Importing {options["module"]} failed:\n{result.stderr[-2000:]}')
+
+        # Lines look like: "import time:  self [us] | cumulative | imported package"
+        self_times = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            own, _, name = line[len('import time:'):].split('|', 2)
+            package = name.strip().split('.')[0]
+            self_times[package] = self_times.get(package, 0) + int(own)
+
+        total_ms = sum(self_times.values()) / 1000
+        self.stdout.write(f'Importing {options["module"]}: {total_ms:.0f} ms across {len(self_times)} packages\n')
+        self.stdout.write(f'{"package":<32}{"ms":>10}{"share":>8}')
+        ranked = sorted(self_times.items(), key=lambda item: item[1], reverse=True)
+        for package, micros in ranked[:options['top']]:
+            self.stdout.write(f'{package:<32}{micros / 1000:>10.1f}{micros / 1000 / total_ms:>8.0%}')
+
+        problems = [
+            f'{package} is imported at start-up'
+            for package in options['forbid'] if package in self_times
+        ]
+        if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+            problems.append(f'total import time {total_ms:.0f} ms exceeds budget of {options["budget_ms"]:.0f} ms')
+        if problems:
+            raise CommandError('; '.join(problems))
@@ -0,0 +1,25 @@
+"""
+Serve Prometheus metrics for processes that have no HTTP server (Celery workers).
+"""
+import os
+import time
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+from whoosh_api.metrics import collect_registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Expose the metrics written to PROMETHEUS_MULTIPROC_DIR on a port, e.g. as '
+        'a sidecar next to a Celery worker that shares the same directory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=int(os.getenv('METRICS_PORT', '9100')))
+        parser.add_argument('--addr', default='0.0.0.0')
+
+    def handle(self, *args, **options):
+        start_http_server(options['port'], addr=options['addr'], registry=collect_registry())
+        self.stdout.write(f'Serving metrics on {options["addr"]}:{options["port"]}')
+        while True:
+            time.sleep(3600)
@@ -0,0 +1,94 @@
+"""
+List and export request profiles saved by ``whoosh_api.profiling``.
+"""
+import io
+import json
+import sys
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from whoosh_api.profiling import PROFILE_ID_HEADER, list_profiles, load_profile, load_stats, make_token, profile_path
+
+EXPORT_FORMATS = ('folded', 'calls', 'pstats', 'text')
+
+
+class Command(BaseCommand):
+    help = (
+        'List request profiles in PROFILING_DIR, export one as folded stacks '
+        '(flamegraph.pl, speedscope), its SQL/Redis calls, raw pstats or a text '
+        'report, or mint an X-Whoosh-Profile header that profiles a request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help='Profile directory (default: PROFILING_DIR)')
+        actions = parser.add_subparsers(dest='action', required=True)
+
+        list_parser = actions.add_parser('list', help='List saved profiles, newest first')
+        list_parser.add_argument('--limit', type=int, default=50)
+
+        export_parser = actions.add_parser('export', help='Export one profile')
+        export_parser.add_argument('profile_id')
+        export_parser.add_argument('--format', choices=EXPORT_FORMATS, default='folded')
+        export_parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+
+        token_parser = actions.add_parser('token', help='Print an X-Whoosh-Profile header value')
+        token_parser.add_argument('--label', default='', help='Saved with every profile the token triggers')
+
+    def handle(self, *args, **options):
+        if options['action'] == 'token':
+            self._token(options['label'])
+        elif options['action'] == 'list':
+            self._list(options['dir'], options['limit'])
+        else:
+            self._export(options['dir'], options['profile_id'], options['format'], options['output'])
+
+    def _token(self, label):
+        if not settings.PROFILING_ENABLED:
+            self.stderr.write('PROFILING_ENABLED is off here; the token only works where it is on',
+                              style_func=self.style.WARNING)
+        self.stdout.write(make_token(label))
+        self.stderr.write(
+            f'Valid for {settings.PROFILING_TOKEN_MAX_AGE}s. Send it as "X-Whoosh-Profile: <token>"; '
+            f'the response\'s {PROFILE_ID_HEADER} header names the saved profile.'
+        )
+
+    def _list(self, directory, limit):
+        profiles = list_profiles(directory)[:limit]
+        if not profiles:
+            self.stdout.write(f'No profiles in {directory or settings.PROFILING_DIR}')
+            return
+        for profile in profiles:
+            created = datetime.fromtimestamp(profile['created_at'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            trigger = profile['trigger'] + (f' ({profile["label"]})' if profile['label'] else '')
+            self.stdout.write(
+                f'{profile["id"]}  {created}  {profile["duration_ms"]:>9.1f}ms  {profile["status"]}  '
+                f'{profile["method"]} {profile["path"]}  '
+                f'sql {profile["sql"]["count"]}/{profile["sql"]["ms"]:.1f}ms  '
+                f'redis {profile["redis"]["count"]}/{profile["redis"]["ms"]:.1f}ms  {trigger}'
+            )
+
+    def _export(self, directory, profile_id, fmt, output):
+        try:
+            if fmt == 'calls':
+                data = json.dumps(load_profile(profile_id, directory), indent=2).encode() + b'\n'
+            elif fmt == 'text':
+                report = io.StringIO()
+                stats = load_stats(profile_id, directory)
+                stats.stream = report
+                stats.sort_stats('cumulative').print_stats(50)
+                data = report.getvalue().encode()
+            else:
+                # Stored ready to use: sampled stacks, or cProfile's marshal
+                # format as snakeviz and pstats read it
+                suffix = '.folded' if fmt == 'folded' else '.prof'
+                with open(profile_path(profile_id, suffix, directory), 'rb') as f:
+                    data = f.read()
+        except FileNotFoundError:
+            raise CommandError(f'No profile {profile_id!r}; see "manage.py profiles list"')
+
+        if output:
+            with open(output, 'wb') as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,76 @@
+"""
+Close the ranked season: snapshot standings and soft-reset ELO.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from apps.seasons.models import Season
+from apps.seasons.rollover import RolloverError, begin_rollover, run_rollover
+
+
+class Command(BaseCommand):
+    help = (
+        'Begin a season rollover (end the active season and start the next), run '
+        'the rollover in progress in chunks until it is done, or show the seasons. '
+        'A run can be stopped at any time; the next one resumes where it left off.'
+    )
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest='action', required=True)
+
+        begin_parser = actions.add_parser('begin', help='End the active season and start the next one')
+        begin_parser.add_argument('--name', help='Name of the new season (default: "Season <number>")')
+        begin_parser.add_argument('--target-elo', type=int,
+                                  help='ELO ratings are reset toward (default: SEASON_RESET_TARGET_ELO)')
+        begin_parser.add_argument('--keep', type=float,
+                                  help='Share of the distance from the target kept (default: SEASON_RESET_KEEP)')
+
+        run_parser = actions.add_parser('run', help='Run the rollover in progress to completion')
+        run_parser.add_argument('--batch-size', type=int, help='Rows per chunk (default: SEASON_ROLLOVER_BATCH_SIZE)')
+        run_parser.add_argument('--time-budget', type=float,
+                                help='Seconds between progress reports (default: SEASON_ROLLOVER_TIME_BUDGET)')
+
+        actions.add_parser('status', help='List the seasons and rollover progress')
+
+    def handle(self, *args, **options):
+        if options['action'] == 'begin':
+            self._begin(options)
+        elif options['action'] == 'run':
+            self._run(options['batch_size'], options['time_budget'])
+        else:
+            self._status()
+
+    def _begin(self, options):
+        keep = options['keep']
+        if keep is not None and not 0 <= keep <= 1:
+            raise CommandError('--keep must be between 0 and 1')
+        try:
+            season = begin_rollover(options['name'], options['target_elo'], keep)
+        except RolloverError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'{season.name} ended; resetting toward {season.reset_target_elo} keeping {season.reset_keep:g}. '
+            f'Run "manage.py season_rollover run" (or the rollover_season task) to finish it.'
+        ))
+
+    def _run(self, batch_size, time_budget):
+        while True:
+            result = run_rollover(batch_size=batch_size, time_budget=time_budget)
+            if result is None:
+                raise CommandError('No rollover in progress; start one with "season_rollover begin"')
+            self.stdout.write(
+                f'Season {result["season"]}: phase {result["phase"]}, {result["players"]} players, '
+                f'{result["chunks"]} chunks in {result["elapsed_seconds"]}s'
+            )
+            if result['complete']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'Season {result["season"]} closed'))
+
+    def _status(self):
+        for season in Season.objects.all()[:10]:
+            line = f'{season.number:>4}  {season.name}  {season.status}  started {season.started_at:%Y-%m-%d %H:%M}'
+            if season.ended_at:
+                line += f'  ended {season.ended_at:%Y-%m-%d %H:%M}'
+            if season.status == Season.STATUS_ROLLING_OVER:
+                line += f'  phase {season.rollover_phase} at {season.rollover_cursor or "start"}'
+            if season.status != Season.STATUS_ACTIVE:
+                line += f'  {season.player_count} players'
+            self.stdout.write(line)
@@ -0,0 +1,78 @@
+"""
+Operational views for the Django API.
+"""
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from whoosh_api.db_backend.base import connection_stats
+from .connections import connections_per_worker
+from .export import (
+    EXPORTS, FORMATS, astream, default_database, default_until, export_filename, parse_watermark, stream_export,
+)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_health(request):
+    """
+    Connection statistics for the worker process that served the request (staff only).
+
+    ``connect_seconds_*`` is the time spent acquiring connections (a new
+    connection, or a pool checkout when pooling is enabled); ``saturation`` is
+    the share of this worker's connection capacity, across all database
+    aliases, currently open.
+    """
+    stats = connection_stats()
+    capacity = connections_per_worker()
+    stats['connect_seconds_avg'] = (
+        stats['connect_seconds_total'] / stats['connects'] if stats['connects'] else 0.0
+    )
+    stats['capacity'] = capacity
+    stats['saturation'] = round(stats['open'] / capacity, 3) if capacity else 0.0
+
+    pool = getattr(connections['default'], 'pool', None)
+    if pool is not None:
+        stats['pool'] = pool.get_stats()
+
+    return Response(stats, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_table(request, table):
+    """
+    Stream ``users``, ``matches`` or ``match_participants`` for analytics (staff only).
+
+    Query parameters: ``output`` (``ndjson`` or ``csv``), ``gzip=1``, and
+    ``since``/``until`` ISO 8601 watermarks (``until`` defaults to
+    ``default_until()``). The response carries the ``until`` it used in
+    ``X-Export-Until``; pass it as ``since`` next time. Reads from the
+    replica when one is configured.
+    """
+    if table not in EXPORTS:
+        return Response({'error': f'Unknown table: {table}'}, status=status.HTTP_404_NOT_FOUND)
+    fmt = request.query_params.get('output', 'ndjson')
+    if fmt not in FORMATS:
+        return Response({'error': f'output must be one of {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+    compress = request.query_params.get('gzip') in ('1', 'true')
+    try:
+        since = request.query_params.get('since')
+        since = parse_watermark(since) if since else None
+        until = request.query_params.get('until')
+        until = parse_watermark(until) if until else default_until()
+    except ValueError:
+        return Response({'error': 'since and until must be ISO 8601 times'}, status=status.HTTP_400_BAD_REQUEST)
+
+    chunks = stream_export(table, fmt, compress, since, until, using=default_database())
+    if isinstance(request._request, ASGIRequest):
+        # A sync iterator would be buffered whole before the first byte
+        chunks = astream(chunks)
+    response = StreamingHttpResponse(chunks, content_type='application/gzip' if compress else FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(table, fmt, compress, until)}"'
+    response['X-Export-Until'] = until.isoformat()
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,285 @@
+"""
+Currency ledger writes and hot balances.
+
+The ledger (``economy_ledger``) is the source of truth and is append-only.
+Balances are served from Redis (``economy:balance:{user_id}:{currency}``) and
+never by summing the ledger:
+
+- grants insert their rows first and then ``INCRBY`` the hot balance, but only
+  if it is already cached;
+- debits take the amount off the hot balance atomically in Lua (refusing to go
+  below zero) and then insert their row, giving it back if the insert fails;
+- a missing hot balance is rebuilt from the user's ``BalanceSnapshot`` plus the
+  ledger rows after it, and ``tasks.reconcile_balances`` moves the snapshots
+  forward and corrects hot balances that drifted.
+
+Every row carries an idempotency key, unique per user, so retried requests and
+re-submitted match results never apply twice.
+"""
+import collections
+import logging
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from whoosh_api.redis_client import get_redis
+from .models import BalanceSnapshot, LedgerEntry
+
+logger = logging.getLogger(__name__)
+
+Grant = collections.namedtuple(
+    'Grant', ['user_id', 'amount', 'kind', 'idempotency_key', 'reference', 'currency'],
+    defaults=('', None),
+)
+
+# Rows per multi-row INSERT when granting in bulk
+GRANT_CHUNK_SIZE = 1000
+
+# Take ARGV[1] off KEYS[1] unless that would go below zero.
+# Returns {status, balance}: 0 = not cached, 1 = debited, 2 = insufficient funds.
+DEBIT_SCRIPT = """
+local balance = redis.call('GET', KEYS[1])
+if not balance then
+    return {0, 0}
+end
+balance = tonumber(balance)
+local amount = tonumber(ARGV[1])
+if balance < amount then
+    return {2, balance}
+end
+return {1, redis.call('DECRBY', KEYS[1], amount)}
+"""
+
+# INCRBY ARGV[i] into KEYS[i], but only for cached balances; an uncached one is
+# rebuilt from the ledger anyway. Returns the new balances, nil where uncached.
+# All keys in one call: Redis runs without cluster mode, so they share a node.
+INCR_IF_CACHED_SCRIPT = """
+local balances = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        balances[i] = redis.call('INCRBY', key, ARGV[i])
+    else
+        balances[i] = false
+    end
+end
+return balances
+"""
+
+# Replace KEYS[1] with ARGV[2] only if it still holds ARGV[1].
+COMPARE_AND_SET_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+    return 1
+end
+return 0
+"""
+
+DEBIT_NOT_CACHED = 0
+DEBIT_APPLIED = 1
+DEBIT_INSUFFICIENT = 2
+
+_scripts = {}
+
+
+class InsufficientFunds(Exception):
+    """Raised by ``debit`` when the balance does not cover the amount."""
+
+    def __init__(self, balance):
+        super().__init__('Insufficient funds')
+        self.balance = balance
+
+
+def balance_key(user_id, currency):
+    """Redis key holding the hot balance of a user in one currency."""
+    return f'economy:balance:{user_id}:{currency}'
+
+
+def script(name):
+    """Registered Lua script (``debit``, ``incr_if_cached`` or ``compare_and_set``)."""
+    if name not in _scripts:
+        source = {
+            'debit': DEBIT_SCRIPT,
+            'incr_if_cached': INCR_IF_CACHED_SCRIPT,
+            'compare_and_set': COMPARE_AND_SET_SCRIPT,
+        }[name]
+        _scripts[name] = get_redis().register_script(source)
+    return _scripts[name]
+
+
+def _check_currency(currency):
+    if currency not in settings.ECONOMY_CURRENCIES:
+        raise ValueError(f'Unknown currency: {currency}')
+
+
+def _check_amount(amount):
+    if not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+        raise ValueError('amount must be a positive integer')
+
+
+def ledger_tables():
+    """Quoted ``(ledger, snapshots)`` table names for raw SQL."""
+    quote = connection.ops.quote_name
+    return quote(LedgerEntry._meta.db_table), quote(BalanceSnapshot._meta.db_table)
+
+
+def db_balances(pairs):
+    """
+    Balances straight from the database for ``(user_id, currency)`` pairs:
+    the snapshot plus the ledger rows after it, in one query.
+    """
+    if not pairs:
+        return {}
+    ledger, snapshots = ledger_tables()
+    user_ids, currencies = zip(*pairs)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT p.user_id, p.currency, COALESCE(s.balance, 0) + COALESCE(('
+            f'  SELECT SUM(l.amount) FROM {ledger} l'
+            f'  WHERE l.user_id = p.user_id AND l.currency = p.currency'
+            f'  AND l.id > COALESCE(s.last_entry_id, 0)'
+            f'), 0) '
+            f'FROM unnest(%s::bigint[], %s::varchar[]) AS p(user_id, currency) '
+            f'LEFT JOIN {snapshots} s ON s.user_id = p.user_id AND s.currency = p.currency',
+            [list(user_ids), list(currencies)]
+        )
+        return {(user_id, currency): int(balance) for user_id, currency, balance in cursor.fetchall()}
+
+
+def _cache_balances(r, balances):
+    """Store rebuilt balances unless another request cached them first."""
+    pipe = r.pipeline(transaction=False)
+    for (user_id, currency), balance in balances.items():
+        pipe.set(balance_key(user_id, currency), balance, ex=settings.ECONOMY_BALANCE_TTL, nx=True)
+    pipe.execute()
+
+
+def get_balances(user_id, currencies=None):
+    """
+    Return ``{currency: balance}`` for one user.
+
+    Hot balances are read with one MGET; missing ones are rebuilt from the
+    database and cached. If Redis is down the database answers instead.
+    """
+    currencies = list(currencies or settings.ECONOMY_CURRENCIES)
+    r = get_redis()
+    try:
+        cached = r.mget([balance_key(user_id, currency) for currency in currencies])
+    except redis.RedisError:
+        logger.warning('Balance cache read failed, falling back to database', exc_info=True)
+        loaded = db_balances([(user_id, currency) for currency in currencies])
+        return {currency: balance for (_, currency), balance in loaded.items()}
+
+    balances = {currency: int(value) for currency, value in zip(currencies, cached) if value is not None}
+    missing = [(user_id, currency) for currency in currencies if currency not in balances]
+    if missing:
+        loaded = db_balances(missing)
+        try:
+            _cache_balances(r, loaded)
+        except redis.RedisError:
+            logger.warning('Balance cache write failed', exc_info=True)
+        balances.update({currency: balance for (_, currency), balance in loaded.items()})
+    return {currency: balances[currency] for currency in currencies}
+
+
+def grant(grants):
+    """
+    Credit currency for many ``Grant`` rows at once (match rewards, purchases).
+
+    Rows are written with multi-row ``INSERT ... ON CONFLICT DO NOTHING``, so a
+    grant whose ``(user_id, idempotency_key)`` is already in the ledger is
+    skipped. Hot balances are incremented after the surrounding transaction
+    commits. Returns the grants that were newly applied.
+    """
+    grants = [g if g.currency else g._replace(currency=settings.ECONOMY_DEFAULT_CURRENCY) for g in grants]
+    # A key repeated within one statement is inserted once; keep the first
+    unique = {}
+    for g in grants:
+        unique.setdefault((g.user_id, g.idempotency_key), g)
+    grants = list(unique.values())
+    for g in grants:
+        _check_amount(g.amount)
+        _check_currency(g.currency)
+
+    ledger, _ = ledger_tables()
+    applied = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(grants), GRANT_CHUNK_SIZE):
+            chunk = grants[start:start + GRANT_CHUNK_SIZE]
+            params = []
+            for g in chunk:
+                params.extend([g.user_id, g.currency, g.amount, g.kind, g.idempotency_key, g.reference])
+            cursor.execute(
+                f'INSERT INTO {ledger} (user_id, currency, amount, kind, idempotency_key, reference) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(chunk))} '
+                f'ON CONFLICT (user_id, idempotency_key) DO NOTHING '
+                f'RETURNING user_id, idempotency_key',
+                params
+            )
+            inserted = set(cursor.fetchall())
+            applied.extend(g for g in chunk if (g.user_id, g.idempotency_key) in inserted)
+
+    if applied:
+        transaction.on_commit(lambda: _increment_cached(applied))
+    return applied
+
+
+def _increment_cached(grants):
+    totals = collections.Counter()
+    for g in grants:
+        totals[g.user_id, g.currency] += g.amount
+    try:
+        script('incr_if_cached')(
+            keys=[balance_key(user_id, currency) for user_id, currency in totals],
+            args=list(totals.values()),
+        )
+    except redis.RedisError:
+        # The cached balance stays low until reconciliation corrects it
+        logger.warning('Balance cache increment failed', exc_info=True)
+
+
+def debit(user_id, amount, kind, idempotency_key, reference='', currency=None):
+    """
+    Spend ``amount`` of a user's currency and return ``(balance, applied)``.
+
+    The hot balance is checked and decremented atomically in Redis before the
+    ledger row is written, so concurrent spends can never overdraw. If the
+    idempotency key was already used the amount is given back and ``applied``
+    is ``False``. Raises ``InsufficientFunds`` when the balance is too low.
+    """
+    currency = currency or settings.ECONOMY_DEFAULT_CURRENCY
+    _check_amount(amount)
+    _check_currency(currency)
+
+    r = get_redis()
+    key = balance_key(user_id, currency)
+    debit_script = script('debit')
+    status, balance = debit_script(keys=[key], args=[amount])
+    if status == DEBIT_NOT_CACHED:
+        _cache_balances(r, db_balances([(user_id, currency)]))
+        status, balance = debit_script(keys=[key], args=[amount])
+    if status == DEBIT_INSUFFICIENT:
+        # A retry of a spend that already went through may no longer be covered
+        if LedgerEntry.objects.filter(user_id=user_id, idempotency_key=idempotency_key).exists():
+            return int(balance), False
+        raise InsufficientFunds(balance)
+    if status != DEBIT_APPLIED:
+        # Evicted again between the rebuild and the retry
+        raise redis.RedisError(f'Balance {key} could not be cached')
+
+    ledger, _ = ledger_tables()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {ledger} (user_id, currency, amount, kind, idempotency_key, reference) '
+                f'VALUES (%s, %s, %s, %s, %s, %s) '
+                f'ON CONFLICT (user_id, idempotency_key) DO NOTHING RETURNING id',
+                [user_id, currency, -amount, kind, idempotency_key, reference]
+            )
+            applied = cursor.fetchone() is not None
+    except Exception:
+        script('incr_if_cached')(keys=[key], args=[amount])
+        raise
+
+    if not applied:
+        refunded = script('incr_if_cached')(keys=[key], args=[amount])[0]
+        balance = refunded if refunded is not None else get_balances(user_id, [currency])[currency]
+    return int(balance), applied
@@ -0,0 +1,70 @@
+"""
+Economy models: the append-only currency ledger and balance snapshots.
+"""
+from django.db import models
+from django.db.models.functions import Now
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class LedgerEntry(models.Model):
+    """
+    One currency movement. Rows are only ever inserted, never updated.
+
+    ``amount`` is signed: grants are positive, spends negative. Every lookup
+    and unique constraint leads with ``user``, and nothing references ledger
+    rows by foreign key, so the table can be hash-partitioned on ``user_id``
+    once it outgrows a single heap.
+    """
+    KIND_REWARD = 'reward'
+    KIND_PURCHASE = 'purchase'
+    KIND_SPEND = 'spend'
+    KIND_ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (KIND_REWARD, 'Match reward'),
+        (KIND_PURCHASE, 'Purchase'),
+        (KIND_SPEND, 'Spend'),
+        (KIND_ADJUSTMENT, 'Adjustment'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Covered by the (user, currency, id) index below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, related_name='ledger_entries')
+    currency = models.CharField(max_length=16)
+    amount = models.BigIntegerField()
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    idempotency_key = models.CharField(max_length=128)
+    reference = models.CharField(max_length=128, blank=True, default='')
+    created_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = 'economy_ledger'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='economy_ledger_idempotency'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'currency', 'id'], name='economy_ledger_user_tail'),
+        ]
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Balance of a user in one currency, covering every ledger entry up to
+    ``last_entry_id``. Written by ``apps.economy.tasks.reconcile_balances``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, related_name='balance_snapshots')
+    currency = models.CharField(max_length=16)
+    balance = models.BigIntegerField(default=0)
+    last_entry_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'economy_balance_snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'currency'], name='economy_snapshot_user_currency'),
+        ]
+        indexes = [
+            # Reconciliation resumes from MAX(last_entry_id)
+            models.Index(fields=['last_entry_id'], name='economy_snapshot_cursor'),
+        ]
@@ -0,0 +1,149 @@
+"""
+Celery tasks for the economy ledger.
+"""
+import time
+import uuid
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from whoosh_api.metrics import observe_task
+from whoosh_api.redis_client import get_redis
+from .ledger import balance_key, db_balances, ledger_tables, script
+from .models import BalanceSnapshot
+
+RECONCILE_LOCK_KEY = 'economy:reconcile:lock'
+# Hot balances seen below the ledger on the previous run: {"user_id:currency": value}
+DRIFT_KEY = 'economy:drift'
+
+
+def _advance_snapshots(cursor, after_id, up_to_id):
+    """
+    Fold ledger rows ``(after_id, up_to_id]`` into the snapshots of the users
+    they touch. Returns the ``(user_id, currency)`` pairs that were updated.
+    """
+    ledger, snapshots = ledger_tables()
+    cursor.execute(
+        f'INSERT INTO {snapshots} (user_id, currency, balance, last_entry_id, updated_at) '
+        f'SELECT l.user_id, l.currency, COALESCE(s.balance, 0) + SUM(l.amount), %(up_to)s, now() '
+        f'FROM {ledger} l '
+        f'LEFT JOIN {snapshots} s ON s.user_id = l.user_id AND s.currency = l.currency '
+        f'WHERE (l.user_id, l.currency) IN ('
+        f'  SELECT DISTINCT user_id, currency FROM {ledger} WHERE id > %(after)s AND id <= %(up_to)s'
+        f') AND l.id > COALESCE(s.last_entry_id, 0) AND l.id <= %(up_to)s '
+        f'GROUP BY l.user_id, l.currency, s.balance '
+        f'ON CONFLICT (user_id, currency) DO UPDATE SET '
+        f'balance = EXCLUDED.balance, last_entry_id = EXCLUDED.last_entry_id, updated_at = EXCLUDED.updated_at '
+        f'WHERE {snapshots}.last_entry_id < EXCLUDED.last_entry_id '
+        f'RETURNING user_id, currency',
+        {'after': after_id, 'up_to': up_to_id}
+    )
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def _correct_hot_balances(r, pairs):
+    """
+    Compare cached balances of ``pairs`` with the ledger and fix the ones that drifted.
+
+    Redis is read before the database, so a spend or grant landing in between
+    shows up as a changed cached value and the compare-and-set leaves it alone.
+    A cached balance above the ledger is lowered at once. One below it may be a
+    spend whose row is not committed yet, so it is only raised if the same
+    value is still there on the next run. Returns the number corrected.
+    """
+    if not pairs:
+        return 0
+    fields = [f'{user_id}:{currency}' for user_id, currency in pairs]
+    cached = r.mget([balance_key(user_id, currency) for user_id, currency in pairs])
+    seen = r.hmget(DRIFT_KEY, fields)
+    expected = db_balances(pairs)
+
+    compare_and_set = script('compare_and_set')
+    pipe = r.pipeline(transaction=False)
+    corrected = 0
+    for pair, field, value, previous in zip(pairs, fields, cached, seen):
+        key = balance_key(*pair)
+        if value is None or int(value) == expected[pair]:
+            pipe.hdel(DRIFT_KEY, field)
+        elif int(value) > expected[pair] or value == previous:
+            compare_and_set(keys=[key], args=[value, expected[pair]], client=pipe)
+            pipe.hdel(DRIFT_KEY, field)
+            corrected += 1
+        else:
+            pipe.hset(DRIFT_KEY, field, value)
+    pipe.expire(DRIFT_KEY, settings.ECONOMY_BALANCE_TTL)
+    pipe.execute()
+    return corrected
+
+
+@shared_task
+@observe_task
+def reconcile_balances(batch_size=None, time_budget=None):
+    """
+    Move balance snapshots forward and correct drifted hot balances.
+
+    Walks the ledger by id from the highest ``last_entry_id`` already folded
+    into a snapshot, one chunk per transaction. Rows younger than
+    ``ECONOMY_SNAPSHOT_LAG_SECONDS`` are left for the next run, so a row whose
+    transaction commits after a higher id is never skipped. Run it every
+    minute or so; one run at a time is enforced with a Redis lock.
+    """
+    batch_size = batch_size or settings.ECONOMY_RECONCILE_BATCH_SIZE
+    time_budget = time_budget or settings.ECONOMY_RECONCILE_TIME_BUDGET
+
+    r = get_redis()
+    lock = str(uuid.uuid4())
+    if not r.set(RECONCILE_LOCK_KEY, lock, nx=True, ex=int(time_budget) + 60):
+        return {'skipped': 'another reconciliation is running'}
+
+    started = time.monotonic()
+    settled_before = timezone.now() - timedelta(seconds=settings.ECONOMY_SNAPSHOT_LAG_SECONDS)
+    ledger, _ = ledger_tables()
+    snapshots_updated = 0
+    corrected = 0
+    complete = False
+
+    try:
+        # Drift spotted on the last run is re-checked even without new ledger rows
+        pending = [field.split(':', 1) for field in r.hkeys(DRIFT_KEY)]
+        corrected += _correct_hot_balances(r, [(int(user_id), currency) for user_id, currency in pending])
+
+        after_id = BalanceSnapshot.objects.aggregate(cursor=Max('last_entry_id'))['cursor'] or 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT id, created_at FROM {ledger} WHERE id > %s ORDER BY id LIMIT %s',
+                    [after_id, batch_size]
+                )
+                rows = cursor.fetchall()
+                settled = 0
+                while settled < len(rows) and rows[settled][1] < settled_before:
+                    settled += 1
+                if not settled:
+                    complete = True
+                    break
+                up_to_id = rows[settled - 1][0]
+                pairs = _advance_snapshots(cursor, after_id, up_to_id)
+
+            snapshots_updated += len(pairs)
+            corrected += _correct_hot_balances(r, pairs)
+            after_id = up_to_id
+
+            if settled < batch_size:
+                complete = True
+                break
+            if time.monotonic() - started >= time_budget:
+                break
+    finally:
+        if r.get(RECONCILE_LOCK_KEY) == lock:
+            r.delete(RECONCILE_LOCK_KEY)
+
+    return {
+        'snapshots_updated': snapshots_updated,
+        'hot_balances_corrected': corrected,
+        'last_entry_id': after_id,
+        'complete': complete,
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+    }
@@ -0,0 +1,11 @@
+"""
+URL configuration for economy app.
+"""
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('balance/', views.balance, name='economy-balance'),
+    path('transactions/', views.transactions, name='economy-transactions'),
+    path('spend/', views.spend, name='economy-spend'),
+]
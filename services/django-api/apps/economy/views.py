@@ -0,0 +1,78 @@
+"""
+Economy views: balances, transaction history and spends.
+"""
+import redis
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from .ledger import InsufficientFunds, debit, get_balances
+from .models import LedgerEntry
+
+TRANSACTIONS_MAX_LIMIT = 100
+
+
+@api_view(['GET'])
+def balance(request):
+    """Current balance in every currency, served from the hot balance cache."""
+    return Response({'balances': get_balances(request.user.id)})
+
+
+@api_view(['GET'])
+def transactions(request):
+    """
+    Ledger entries of the current user in one currency, newest first.
+
+    Paginate with ``?before=<next_before>`` from the previous page.
+    """
+    currency = request.query_params.get('currency', settings.ECONOMY_DEFAULT_CURRENCY)
+    try:
+        limit = int(request.query_params.get('limit', 50))
+        before = request.query_params.get('before')
+        before = int(before) if before else None
+    except ValueError:
+        return Response({'error': 'limit and before must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, TRANSACTIONS_MAX_LIMIT))
+
+    entries = LedgerEntry.objects.filter(user=request.user, currency=currency)
+    if before is not None:
+        entries = entries.filter(id__lt=before)
+    entries = list(
+        entries.order_by('-id')
+        .values('id', 'amount', 'kind', 'reference', 'created_at')[:limit]
+    )
+
+    return Response({
+        'results': entries,
+        'next_before': entries[-1]['id'] if len(entries) == limit else None,
+    })
+
+
+@api_view(['POST'])
+def spend(request):
+    """
+    Spend currency. ``idempotency_key`` is required: retrying with the same key
+    never charges twice.
+    """
+    amount = request.data.get('amount')
+    idempotency_key = request.data.get('idempotency_key')
+    if not idempotency_key:
+        return Response({'error': 'idempotency_key is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        new_balance, applied = debit(
+            request.user.id,
+            amount,
+            LedgerEntry.KIND_SPEND,
+            str(idempotency_key)[:128],
+            reference=str(request.data.get('reference', ''))[:128],
+            currency=request.data.get('currency'),
+        )
+    except InsufficientFunds as e:
+        return Response({'error': str(e), 'balance': e.balance}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except redis.RedisError:
+        return Response({'error': 'Balance service unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    return Response({'balance': new_balance, 'applied': applied})
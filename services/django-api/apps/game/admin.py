@@ -0,0 +1,77 @@
+"""
+Admin for match history.
+"""
+import uuid
+from django.contrib import admin
+from django.db import connection, transaction
+from apps.core.admin import LargeTableAdmin, in_batches
+from .models import Match, MatchParticipant
+
+
+class MatchParticipantInline(admin.TabularInline):
+    model = MatchParticipant
+    fields = ('user', 'elo_before', 'elo_after', 'xp_gained', 'is_winner')
+    raw_id_fields = ('user',)
+    extra = 0
+
+
+@admin.register(Match)
+class MatchAdmin(LargeTableAdmin):
+    """Matches, newest first, found by exact id."""
+    list_display = ('id', 'started_at', 'ended_at', 'status', 'winner_id')
+    list_filter = ('status',)
+    # Only exact match ids are searched, see get_search_results
+    search_fields = ('id',)
+    ordering = ('-started_at',)
+    sortable_by = ('started_at',)
+    readonly_fields = ('started_at',)
+    inlines = (MatchParticipantInline,)
+    actions = ('delete_matches',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        try:
+            return queryset.filter(pk=uuid.UUID(search_term.strip())), False
+        except ValueError:
+            return queryset.none(), False
+
+    @admin.action(description='Delete selected matches (batched)', permissions=['delete'])
+    def delete_matches(self, request, queryset):
+        quote = connection.ops.quote_name
+        matches_table = quote(Match._meta.db_table)
+        participants_table = quote(MatchParticipant._meta.db_table)
+        deleted = 0
+        for ids in in_batches(queryset):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {participants_table} WHERE match_id = ANY(%s)', [ids])
+                cursor.execute(f'DELETE FROM {matches_table} WHERE id = ANY(%s)', [ids])
+                deleted += cursor.rowcount
+        self.message_user(request, f'Deleted {deleted} matches.')
+
+
+@admin.register(MatchParticipant)
+class MatchParticipantAdmin(LargeTableAdmin):
+    """
+    Participant rows, newest first. Search takes a user id or a match id,
+    both served by the foreign key indexes.
+    """
+    list_display = ('id', 'match', 'user', 'elo_before', 'elo_after', 'xp_gained', 'is_winner')
+    list_select_related = ('match', 'user')
+    list_filter = ('is_winner',)
+    search_fields = ('user__id', 'match__id')
+    ordering = ('-id',)
+    sortable_by = ('id',)
+    raw_id_fields = ('match',)
+    autocomplete_fields = ('user',)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(user_id=int(search_term)), False
+        try:
+            return queryset.filter(match_id=uuid.UUID(search_term)), False
+        except ValueError:
+            return queryset.none(), False
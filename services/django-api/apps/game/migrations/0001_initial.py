@@ -0,0 +1,47 @@
+# Generated by Django 5.0 on 2026-10-19 09:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(default='completed', max_length=20)),
+                ('winner_id', models.UUIDField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'matches',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MatchParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('elo_before', models.IntegerField()),
+                ('elo_after', models.IntegerField()),
+                ('xp_gained', models.IntegerField(default=0)),
+                ('is_winner', models.BooleanField(default=False)),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='game.match')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'match_participants',
+                'unique_together': {('match', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-19 09:58
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('game', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='match',
+            index=models.Index(fields=['started_at'], name='matches_started_at_idx'),
+        ),
+    ]
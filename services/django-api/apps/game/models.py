@@ -18,6 +18,9 @@ class Match(models.Model):
     class Meta:
         db_table = 'matches'
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['started_at'], name='matches_started_at_idx'),
+        ]
 
 
 class MatchParticipant(models.Model):
@@ -1,26 +1,43 @@
 """
 Game views for match history and results.
 """
-import json
+import hmac
+import orjson
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from .models import Match, MatchParticipant
+from apps.economy.ledger import Grant, grant
+from apps.economy.models import LedgerEntry
+from apps.users.cache import invalidate_public_profiles
 from apps.users.models import User
+from whoosh_api.db_router import pin_to_writer, replica_reads
 
 
+@replica_reads
 @api_view(['GET'])
 def match_history(request):
     """Get match history for current user."""
     user = request.user
-    matches = Match.objects.filter(participants__user=user).distinct()[:20]
+    participations = (
+        MatchParticipant.objects.filter(user=user)
+        .select_related('match')
+        .only(
+            'elo_before', 'elo_after', 'xp_gained', 'is_winner',
+            'match__id', 'match__started_at', 'match__ended_at',
+        )
+        .order_by('-match__started_at')[:20]
+    )
     
     history = []
-    for match in matches:
-        participant = match.participants.get(user=user)
+    for participant in participations:
+        match = participant.match
         history.append({
             'match_id': str(match.id),
             'started_at': match.started_at.isoformat(),
@@ -34,16 +51,31 @@ def match_history(request):
     return Response(history)
 
 
-@csrf_exempt
+def _is_game_server(request):
+    """True if the request carries ``GAME_SERVER_TOKEN`` as a bearer token."""
+    token = settings.GAME_SERVER_TOKEN
+    if not token:
+        return False
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+
+
 @require_http_methods(["POST"])
 def game_result(request):
     """
     gRPC endpoint (simulated via HTTP) for Go service to submit game results.
     This would typically be a gRPC endpoint, but for now we'll use HTTP.
     Guest matches are not persisted - only matches with authenticated users are saved.
+    
+    Only game servers may call it: results pay out rewards, so the request must
+    carry ``GAME_SERVER_TOKEN`` as a bearer token. With no token configured
+    every result is refused.
     """
+    if not _is_game_server(request):
+        return JsonResponse({'status': 'error', 'message': 'Forbidden'}, status=403)
+    
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         game_id = data.get('game_id')
         winner_id = data.get('winner_id')
         participants = data.get('participants', [])
@@ -52,15 +84,17 @@ def game_result(request):
         all_guests = True
         authenticated_users = []
         
+        # One query for every participant instead of one per player
+        user_ids = [p.get('user_id') for p in participants if p.get('user_id') is not None]
+        users = {str(user.id): user for user in User.objects.filter(id__in=user_ids)}
+        
         for participant_data in participants:
-            user_id = participant_data.get('user_id')
-            try:
-                user = User.objects.get(id=user_id)
-                if not user.is_guest:
-                    all_guests = False
-                    authenticated_users.append((user, participant_data))
-            except User.DoesNotExist:
+            user = users.get(str(participant_data.get('user_id')))
+            if user is None:
                 continue
+            if not user.is_guest:
+                all_guests = False
+                authenticated_users.append((user, participant_data))
         
         # If all participants are guests, don't save the match
         if all_guests:
@@ -70,37 +104,69 @@ def game_result(request):
                 'match_id': str(game_id)
             })
         
-        # Create match record only if there are authenticated users
-        match = Match.objects.create(
-            id=game_id,
-            status='completed',
-            winner_id=winner_id
-        )
-        
-        # Create participant records and update user stats (only for authenticated users)
-        for user, participant_data in authenticated_users:
-            elo_before = participant_data.get('elo_before', 1000)
-            elo_after = participant_data.get('elo_after', 1000)
-            xp_gained = participant_data.get('xp_gained', 0)
-            is_winner = participant_data.get('is_winner', False)
+        # The match, its participants, the stats and the rewards commit
+        # together, so a result is either fully recorded or not at all
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    match = Match.objects.create(
+                        id=game_id,
+                        status='completed',
+                        winner_id=winner_id
+                    )
+            except IntegrityError:
+                # A retry of a result that was already recorded in full
+                return JsonResponse({
+                    'status': 'success',
+                    'message': 'Already recorded',
+                    'match_id': str(game_id)
+                })
             
-            MatchParticipant.objects.create(
-                match=match,
-                user=user,
-                elo_before=elo_before,
-                elo_after=elo_after,
-                xp_gained=xp_gained,
-                is_winner=is_winner
-            )
+            # Create participant records and update user stats (only for authenticated users)
+            for user, participant_data in authenticated_users:
+                elo_before = participant_data.get('elo_before', 1000)
+                elo_after = participant_data.get('elo_after', 1000)
+                xp_gained = participant_data.get('xp_gained', 0)
+                is_winner = participant_data.get('is_winner', False)
+                
+                MatchParticipant.objects.create(
+                    match=match,
+                    user=user,
+                    elo_before=elo_before,
+                    elo_after=elo_after,
+                    xp_gained=xp_gained,
+                    is_winner=is_winner
+                )
+                
+                # Update user stats (skip for guests). ELO moves by the match's
+                # change rather than being set to elo_after: a season reset
+                # applied while the match was played must not be overwritten.
+                if not user.is_guest:
+                    User.objects.filter(pk=user.pk).update(
+                        elo=F('elo') + (elo_after - elo_before),
+                        xp=F('xp') + xp_gained,
+                        total_games=F('total_games') + 1,
+                        wins=F('wins') + (1 if is_winner else 0),
+                        updated_at=timezone.now(),
+                    )
             
-            # Update user stats (skip for guests)
-            if not user.is_guest:
-                user.elo = elo_after
-                user.xp += xp_gained
-                user.total_games += 1
-                if is_winner:
-                    user.wins += 1
-                user.save()
+            # Match rewards for every persisted player in one idempotent bulk insert
+            grant([
+                Grant(
+                    user.id,
+                    settings.ECONOMY_MATCH_REWARD
+                    + (settings.ECONOMY_WIN_BONUS if participant_data.get('is_winner', False) else 0),
+                    LedgerEntry.KIND_REWARD,
+                    f'match:{game_id}',
+                    reference=str(game_id),
+                )
+                for user, participant_data in authenticated_users
+            ])
+        
+        # ELO changed, so lobby profiles must be re-read from the writer
+        updated_ids = [user.id for user, _ in authenticated_users]
+        pin_to_writer(updated_ids)
+        invalidate_public_profiles(updated_ids)
         
         return JsonResponse({'status': 'success', 'match_id': str(game_id)})
     
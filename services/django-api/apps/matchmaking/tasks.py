@@ -1,25 +1,33 @@
 """
 Celery tasks for matchmaking.
 """
-import redis
+import json
+import logging
 import uuid
 from celery import shared_task
 from django.conf import settings
+from apps.auth.keys import configure_jwt_keys
+from apps.users.models import User
+from whoosh_api.metrics import observe_task
+from whoosh_api.redis_client import get_redis
+from .tickets import assignment_key, issue_ticket
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
+@observe_task
 def process_matchmaking_queue(queue_name='standard'):
     """Process matchmaking queue and create games when 8 players are ready."""
-    r = redis.Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        db=settings.REDIS_DB,
-        decode_responses=True
-    )
+    r = get_redis()
     
     queue_key = f'matchmaking:queue:{queue_name}'
     players_per_game = 8
     
+    # A signed ticket per player lets the edge admit them without reading the game back.
+    # Load the signing key before taking anyone off the queue.
+    configure_jwt_keys()
+    
     while True:
         # Check if we have enough players
         queue_length = r.llen(queue_key)
@@ -38,19 +46,43 @@ def process_matchmaking_queue(queue_name='standard'):
             game_id = str(uuid.uuid4())
             game_key = f'game:{game_id}'
             
+            try:
+                elos = dict(User.objects.filter(id__in=players).values_list('id', 'elo'))
+                tickets = {
+                    player_id: issue_ticket(game_id, player_id, queue_name, elos.get(int(player_id)))
+                    for player_id in players
+                }
+            except Exception:
+                # Put the players back at the front of the queue, oldest first
+                r.rpush(queue_key, *reversed(players))
+                raise
+            
+            pipe = r.pipeline()
+            
             # Store game info in Redis
-            r.hset(game_key, mapping={
+            pipe.hset(game_key, mapping={
                 'id': game_id,
                 'status': 'waiting',
                 'players': ','.join(players),
             })
             
             # Set expiration (e.g., 10 minutes)
-            r.expire(game_key, 600)
+            pipe.expire(game_key, 600)
+            
+            for player_id in players:
+                ticket, expires_at = tickets[player_id]
+                pipe.set(assignment_key(player_id), json.dumps({
+                    'game_id': game_id,
+                    'queue': queue_name,
+                    'players': players,
+                    'ticket': ticket,
+                    'expires_at': expires_at,
+                }), ex=settings.MATCH_TICKET_LIFETIME)
+            pipe.execute()
             
             # Notify players (this would typically be done via WebSocket)
             # For now, we'll just log it
-            print(f"Created game {game_id} with players: {players}")
+            logger.info('Created game %s with players: %s', game_id, players)
     
     return {'processed': True}
 
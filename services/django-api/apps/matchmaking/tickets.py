@@ -0,0 +1,34 @@
+"""
+Signed match tickets for admission to a game on the Go edge.
+"""
+from datetime import timedelta
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+
+class MatchTicket(Token):
+    """
+    Short-lived RS256 token saying a user was placed in a game.
+
+    Signed with the same key as access tokens, so the edge verifies it offline
+    with the public key it already has. ``token_type`` is ``match_ticket``, so
+    a ticket is never accepted as an API access token.
+    """
+    token_type = 'match_ticket'
+    lifetime = timedelta(seconds=settings.MATCH_TICKET_LIFETIME)
+
+
+def issue_ticket(game_id, user_id, queue, elo):
+    """Return ``(ticket, expires_at_epoch)`` for one player of a new game."""
+    ticket = MatchTicket()
+    ticket[api_settings.USER_ID_CLAIM] = str(user_id)
+    ticket['game_id'] = str(game_id)
+    ticket['queue'] = queue
+    ticket['elo'] = elo
+    return str(ticket), ticket['exp']
+
+
+def assignment_key(user_id):
+    """Redis key holding the game a user was matched into, with their ticket."""
+    return f'matchmaking:assignment:{user_id}'
@@ -1,10 +1,16 @@
 """
 URL configuration for matchmaking app.
 """
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('join/', views.join_queue, name='join-queue'),
+    path('join/', views.join_queue_async if settings.ASYNC_VIEWS else views.join_queue, name='join-queue'),
+    path(
+        'assignment/',
+        views.match_assignment_async if settings.ASYNC_VIEWS else views.match_assignment,
+        name='match-assignment',
+    ),
 ]
 
@@ -1,30 +1,33 @@
 """
 Matchmaking views.
 """
-import redis
-from django.conf import settings
+import json
+from asgiref.sync import sync_to_async
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .tasks import process_matchmaking_queue
+from whoosh_api.async_views import async_api_view, json_response, request_data
+from whoosh_api.redis_client import get_async_redis, get_redis
+from .tickets import assignment_key
 
 
 @api_view(['POST'])
 def join_queue(request):
     """Add user to matchmaking queue."""
+    # Celery is imported on first use to keep it out of worker start-up
+    from .tasks import process_matchmaking_queue
+    
     user_id = str(request.user.id)
     queue_name = request.data.get('queue', 'standard')
     
     try:
-        r = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB,
-            decode_responses=True
-        )
+        r = get_redis()
         
-        # Add user to queue
-        r.lpush(f'matchmaking:queue:{queue_name}', user_id)
+        # Add user to queue, dropping the assignment from their previous game
+        pipe = r.pipeline()
+        pipe.delete(assignment_key(user_id))
+        pipe.lpush(f'matchmaking:queue:{queue_name}', user_id)
+        pipe.execute()
         
         # Trigger matchmaking worker
         process_matchmaking_queue.delay(queue_name)
@@ -41,3 +44,57 @@ def join_queue(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+
+@async_api_view(['POST'])
+async def join_queue_async(request):
+    """Async ``join_queue`` for ASGI deployments; Redis and SQS waits don't hold a thread."""
+    from .tasks import process_matchmaking_queue
+    
+    user_id = str(request.user.id)
+    queue_name = request_data(request).get('queue', 'standard')
+    
+    try:
+        r = get_async_redis()
+        
+        # Add user to queue, dropping the assignment from their previous game
+        pipe = r.pipeline()
+        pipe.delete(assignment_key(user_id))
+        pipe.lpush(f'matchmaking:queue:{queue_name}', user_id)
+        await pipe.execute()
+        
+        # Trigger matchmaking worker (the broker client is blocking)
+        await sync_to_async(process_matchmaking_queue.delay, thread_sensitive=False)(queue_name)
+        
+        return json_response({
+            'message': 'Added to matchmaking queue',
+            'queue': queue_name,
+            'user_id': user_id
+        }, status=status.HTTP_200_OK)
+    
+    except Exception as e:
+        return json_response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+def match_assignment(request):
+    """
+    Game the current user was matched into, with the signed ticket to present
+    to the game edge as ``?ticket=``. 404 while the user is still queued.
+    """
+    raw = get_redis().get(assignment_key(request.user.id))
+    if raw is None:
+        return Response({'error': 'No match assigned yet'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(json.loads(raw))
+
+
+@async_api_view(['GET'])
+async def match_assignment_async(request):
+    """Async ``match_assignment`` for ASGI deployments."""
+    raw = await get_async_redis().get(assignment_key(request.user.id))
+    if raw is None:
+        return json_response({'error': 'No match assigned yet'}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(json.loads(raw))
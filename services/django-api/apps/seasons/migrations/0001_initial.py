@@ -0,0 +1,72 @@
+# Generated by Django 5.0 on 2026-10-19 10:15
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Season',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(unique=True)),
+                ('name', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('rolling_over', 'Rolling over'), ('closed', 'Closed')], default='active', max_length=16)),
+                ('started_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('reset_target_elo', models.IntegerField(blank=True, null=True)),
+                ('reset_keep', models.FloatField(blank=True, null=True)),
+                ('rollover_phase', models.CharField(blank=True, choices=[('snapshot', 'Snapshot ratings'), ('rank', 'Rank players'), ('reset', 'Soft-reset ELO'), ('done', 'Done')], default='', max_length=16)),
+                ('rollover_cursor', models.JSONField(blank=True, default=dict)),
+                ('player_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'seasons',
+                'ordering': ['-number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SeasonResult',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('final_elo', models.IntegerField()),
+                ('rank', models.IntegerField(blank=True, null=True)),
+                ('reset_elo', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'season_results',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='season',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('status',), name='seasons_one_active'),
+        ),
+        migrations.AddField(
+            model_name='seasonresult',
+            name='season',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='results', to='seasons.season'),
+        ),
+        migrations.AddField(
+            model_name='seasonresult',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_results', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='seasonresult',
+            index=models.Index(fields=['season', '-final_elo', 'user'], name='season_results_standing'),
+        ),
+        migrations.AddConstraint(
+            model_name='seasonresult',
+            constraint=models.UniqueConstraint(fields=('season', 'user'), name='season_results_season_user'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def create_first_season(apps, schema_editor):
+    # Ratings so far belong to the season that has implicitly run since launch
+    Season = apps.get_model('seasons', 'Season')
+    if not Season.objects.exists():
+        Season.objects.create(number=1, name='Season 1')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seasons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_first_season, migrations.RunPython.noop),
+    ]
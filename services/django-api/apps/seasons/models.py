@@ -0,0 +1,89 @@
+"""
+Season models: ranked seasons and every player's final standing in them.
+"""
+from django.db import models
+from django.db.models.functions import Now
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class Season(models.Model):
+    """
+    A ranked season. Exactly one is active at a time.
+
+    A rollover closes the active season and opens the next one at once, then
+    works through ``rollover_phase`` in chunks, keeping its place in
+    ``rollover_cursor`` (see ``apps.seasons.rollover``).
+    """
+    STATUS_ACTIVE = 'active'
+    STATUS_ROLLING_OVER = 'rolling_over'
+    STATUS_CLOSED = 'closed'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_ROLLING_OVER, 'Rolling over'),
+        (STATUS_CLOSED, 'Closed'),
+    ]
+
+    PHASE_SNAPSHOT = 'snapshot'
+    PHASE_RANK = 'rank'
+    PHASE_RESET = 'reset'
+    PHASE_DONE = 'done'
+    PHASE_CHOICES = [
+        (PHASE_SNAPSHOT, 'Snapshot ratings'),
+        (PHASE_RANK, 'Rank players'),
+        (PHASE_RESET, 'Soft-reset ELO'),
+        (PHASE_DONE, 'Done'),
+    ]
+
+    number = models.PositiveIntegerField(unique=True)
+    name = models.CharField(max_length=64)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    started_at = models.DateTimeField(db_default=Now())
+    ended_at = models.DateTimeField(null=True, blank=True)
+
+    # Soft reset parameters, fixed when the rollover begins so a resumed
+    # rollover applies the same reset
+    reset_target_elo = models.IntegerField(null=True, blank=True)
+    reset_keep = models.FloatField(null=True, blank=True)
+    rollover_phase = models.CharField(max_length=16, choices=PHASE_CHOICES, blank=True, default='')
+    rollover_cursor = models.JSONField(default=dict, blank=True)
+    player_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'seasons'
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['status'], condition=models.Q(status='active'), name='seasons_one_active',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class SeasonResult(models.Model):
+    """
+    A player's final ELO and rank in a season, and the ELO the soft reset
+    started them on in the next one.
+    """
+    id = models.BigAutoField(primary_key=True)
+    # Covered by the (season, user) constraint below
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, db_index=False, related_name='results')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='season_results')
+    final_elo = models.IntegerField()
+    # Competition ranking: tied players share a rank, the next rank is skipped
+    rank = models.IntegerField(null=True, blank=True)
+    # Set in the same transaction as the user's reset ELO; NULL until then
+    reset_elo = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'season_results'
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'user'], name='season_results_season_user'),
+        ]
+        indexes = [
+            # Final standings, walked in order by the rank phase
+            models.Index(fields=['season', '-final_elo', 'user'], name='season_results_standing'),
+        ]
@@ -0,0 +1,260 @@
+"""
+Season rollover: final standings and the ELO soft reset.
+
+``begin_rollover`` closes the active season and opens the next one in one
+short transaction. The heavy work is then done by ``run_rollover`` in
+phases. Each phase works in chunks of ``SEASON_ROLLOVER_BATCH_SIZE`` rows,
+in keyset order, with each chunk in its own short transaction and a pause
+between chunks:
+
+1. ``snapshot``: copy the ELO of every registered player who has played into
+   ``season_results``, walking ``users`` by id. Matches recorded since the
+   season ended are taken back out, so they count toward the next season.
+2. ``rank``: number the results by final ELO, walking the standings index.
+3. ``reset``: move each player's ELO toward ``reset_target_elo``, keeping
+   ``reset_keep`` of the distance. The result is written to the user and to
+   ``season_results.reset_elo`` in one statement, as a change to the current
+   ELO, so ELO won or lost since the season ended is carried over. Cached
+   public profiles of the chunk are then dropped.
+
+Games go on during a rollover. Match results move ELO by ``elo_after -
+elo_before`` (see ``apps.game.views.game_result``) rather than setting it,
+so a result and a reset of the same player add up in either order.
+
+Every chunk saves the phase and its cursor on the season row in the same
+transaction. A run that stops at its time budget, or dies, resumes exactly
+where it left off. The row is locked for each chunk, so concurrent runs take
+turns instead of repeating work.
+"""
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from whoosh_api.db_router import pin_to_writer
+from apps.game.models import Match, MatchParticipant
+from apps.users.cache import invalidate_public_profiles
+from apps.users.models import User
+from .models import Season, SeasonResult
+
+
+class RolloverError(Exception):
+    """A rollover cannot begin in the current state."""
+
+
+def begin_rollover(name=None, reset_target_elo=None, reset_keep=None):
+    """
+    End the active season now and start the next one. Returns the season
+    being rolled over; ``run_rollover`` does the rest.
+    """
+    with transaction.atomic():
+        if Season.objects.filter(status=Season.STATUS_ROLLING_OVER).exists():
+            raise RolloverError('A rollover is already in progress; finish it with run_rollover')
+        season = Season.objects.select_for_update().filter(status=Season.STATUS_ACTIVE).first()
+        if season is None:
+            raise RolloverError('There is no active season')
+
+        now = timezone.now()
+        season.status = Season.STATUS_ROLLING_OVER
+        season.ended_at = now
+        season.reset_target_elo = settings.SEASON_RESET_TARGET_ELO if reset_target_elo is None else reset_target_elo
+        season.reset_keep = settings.SEASON_RESET_KEEP if reset_keep is None else reset_keep
+        season.rollover_phase = Season.PHASE_SNAPSHOT
+        season.rollover_cursor = {}
+        season.player_count = 0
+        season.save()
+
+        number = season.number + 1
+        Season.objects.create(number=number, name=name or f'Season {number}', started_at=now)
+    return season
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return quote(User._meta.db_table), quote(SeasonResult._meta.db_table)
+
+
+def _match_tables():
+    quote = connection.ops.quote_name
+    return quote(Match._meta.db_table), quote(MatchParticipant._meta.db_table)
+
+
+def _snapshot_chunk(cursor, season, batch_size):
+    users, results = _tables()
+    matches, participants = _match_tables()
+    # "late" is what matches recorded after the season ended changed; players
+    # whose only games are late ones did not play this season
+    cursor.execute(
+        f'WITH chunk AS ('
+        f'  SELECT id, elo, total_games FROM {users} '
+        f'  WHERE id > %(after)s AND NOT is_guest AND total_games > 0 '
+        f'  ORDER BY id LIMIT %(limit)s'
+        f'), late AS ('
+        f'  SELECT p.user_id, sum(p.elo_after - p.elo_before) AS elo, count(*) AS games '
+        f'  FROM {matches} m JOIN {participants} p ON p.match_id = m.id '
+        f'  WHERE m.started_at >= %(ended_at)s AND p.user_id IN (SELECT id FROM chunk) '
+        f'  GROUP BY p.user_id'
+        f'), inserted AS ('
+        f'  INSERT INTO {results} (season_id, user_id, final_elo) '
+        f'  SELECT %(season)s, chunk.id, chunk.elo - coalesce(late.elo, 0) '
+        f'  FROM chunk LEFT JOIN late ON late.user_id = chunk.id '
+        f'  WHERE chunk.total_games > coalesce(late.games, 0) '
+        f'  ON CONFLICT (season_id, user_id) DO NOTHING '
+        f'  RETURNING 1'
+        f') SELECT (SELECT count(*) FROM chunk), (SELECT max(id) FROM chunk), (SELECT count(*) FROM inserted)',
+        {
+            'season': season.id,
+            'after': season.rollover_cursor.get('after_id', 0),
+            'limit': batch_size,
+            'ended_at': season.ended_at,
+        }
+    )
+    scanned, last_id, inserted = cursor.fetchone()
+    season.player_count += inserted
+    if scanned < batch_size:
+        # The planner has no statistics yet on the rows just copied; the
+        # rank and reset phases join on them
+        cursor.execute(f'ANALYZE {results}')
+        season.rollover_phase = Season.PHASE_RANK
+        season.rollover_cursor = {}
+    else:
+        season.rollover_cursor = {'after_id': last_id}
+    return []
+
+
+def _rank_chunk(cursor, season, batch_size):
+    _, results = _tables()
+    state = season.rollover_cursor
+    params = {'season': season.id, 'limit': batch_size}
+    after = ''
+    if state:
+        # Keyset on (final_elo DESC, user_id)
+        after = 'AND (final_elo < %(elo)s OR (final_elo = %(elo)s AND user_id > %(user_id)s)) '
+        params.update(elo=state['elo'], user_id=state['user_id'])
+    cursor.execute(
+        f'SELECT user_id, final_elo FROM {results} WHERE season_id = %(season)s {after}'
+        f'ORDER BY final_elo DESC, user_id LIMIT %(limit)s',
+        params
+    )
+    rows = cursor.fetchall()
+
+    position = state.get('position', 0)
+    rank = state.get('rank', 0)
+    elo = state.get('elo')
+    user_ids, ranks = [], []
+    for user_id, final_elo in rows:
+        position += 1
+        if final_elo != elo:
+            rank = position
+            elo = final_elo
+        user_ids.append(user_id)
+        ranks.append(rank)
+    if rows:
+        cursor.execute(
+            f'UPDATE {results} SET rank = v.rank '
+            f'FROM unnest(%s::bigint[], %s::integer[]) AS v(user_id, rank) '
+            f'WHERE {results}.season_id = %s AND {results}.user_id = v.user_id',
+            [user_ids, ranks, season.id]
+        )
+
+    if len(rows) < batch_size:
+        season.rollover_phase = Season.PHASE_RESET
+        season.rollover_cursor = {}
+    else:
+        season.rollover_cursor = {'elo': elo, 'user_id': user_ids[-1], 'position': position, 'rank': rank}
+    return []
+
+
+def _reset_chunk(cursor, season, batch_size):
+    users, results = _tables()
+    # "reset_elo IS NULL" keeps a chunk from being applied twice
+    cursor.execute(
+        f'WITH chunk AS ('
+        f'  SELECT user_id FROM {results} '
+        f'  WHERE season_id = %(season)s AND user_id > %(after)s '
+        f'  ORDER BY user_id LIMIT %(limit)s'
+        f'), reset AS ('
+        f'  UPDATE {results} r '
+        f'  SET reset_elo = round(%(target)s + (r.final_elo - %(target)s) * %(keep)s) '
+        f'  FROM chunk WHERE r.season_id = %(season)s AND r.user_id = chunk.user_id AND r.reset_elo IS NULL '
+        f'  RETURNING r.user_id, r.final_elo, r.reset_elo'
+        f'), updated AS ('
+        f'  UPDATE {users} u SET elo = u.elo - reset.final_elo + reset.reset_elo, updated_at = now() '
+        f'  FROM reset WHERE u.id = reset.user_id '
+        f'  RETURNING u.id'
+        f') SELECT (SELECT count(*) FROM chunk), (SELECT max(user_id) FROM chunk), '
+        f'(SELECT coalesce(array_agg(id), ARRAY[]::bigint[]) FROM updated)',
+        {
+            'season': season.id,
+            'after': season.rollover_cursor.get('after_id', 0),
+            'limit': batch_size,
+            'target': season.reset_target_elo,
+            'keep': season.reset_keep,
+        }
+    )
+    scanned, last_id, updated_ids = cursor.fetchone()
+    if scanned < batch_size:
+        season.rollover_phase = Season.PHASE_DONE
+        season.rollover_cursor = {}
+        season.status = Season.STATUS_CLOSED
+    else:
+        season.rollover_cursor = {'after_id': last_id}
+    return updated_ids
+
+
+_CHUNKS = {
+    Season.PHASE_SNAPSHOT: _snapshot_chunk,
+    Season.PHASE_RANK: _rank_chunk,
+    Season.PHASE_RESET: _reset_chunk,
+}
+
+
+def _advance(season_id, batch_size):
+    """Run one chunk of the current phase. Returns the season as saved."""
+    with transaction.atomic():
+        season = Season.objects.select_for_update().get(id=season_id)
+        if season.status != Season.STATUS_ROLLING_OVER:
+            return season
+        with connection.cursor() as cursor:
+            updated_ids = _CHUNKS[season.rollover_phase](cursor, season, batch_size)
+        season.save(update_fields=['status', 'rollover_phase', 'rollover_cursor', 'player_count'])
+
+    if updated_ids:
+        # ELO changed, so profiles must be re-read from the writer, as after a match
+        pin_to_writer(updated_ids)
+        invalidate_public_profiles(updated_ids)
+    return season
+
+
+def run_rollover(batch_size=None, time_budget=None):
+    """
+    Advance the rollover in progress until it is done or ``time_budget``
+    seconds have passed. Returns a progress summary, or ``None`` if no
+    rollover is in progress.
+    """
+    batch_size = batch_size or settings.SEASON_ROLLOVER_BATCH_SIZE
+    time_budget = time_budget or settings.SEASON_ROLLOVER_TIME_BUDGET
+    pause = settings.SEASON_ROLLOVER_SLEEP_SECONDS
+
+    season = Season.objects.filter(status=Season.STATUS_ROLLING_OVER).first()
+    if season is None:
+        return None
+
+    started = time.monotonic()
+    chunks = 0
+    while True:
+        season = _advance(season.id, batch_size)
+        chunks += 1
+        if season.status != Season.STATUS_ROLLING_OVER:
+            break
+        if time.monotonic() - started + pause >= time_budget:
+            break
+        time.sleep(pause)
+
+    return {
+        'season': season.number,
+        'phase': season.rollover_phase,
+        'players': season.player_count,
+        'chunks': chunks,
+        'complete': season.status == Season.STATUS_CLOSED,
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+    }
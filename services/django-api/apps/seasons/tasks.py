@@ -0,0 +1,20 @@
+"""
+Celery tasks for ranked seasons.
+"""
+from celery import shared_task
+from whoosh_api.metrics import observe_task
+from .rollover import run_rollover
+
+
+@shared_task
+@observe_task
+def rollover_season(batch_size=None, time_budget=None):
+    """
+    Advance the season rollover in progress for one time budget, then queue
+    another run until it is complete. Start a rollover with
+    ``manage.py season_rollover begin``; this task does nothing without one.
+    """
+    result = run_rollover(batch_size=batch_size, time_budget=time_budget)
+    if result is not None and not result['complete']:
+        rollover_season.delay(batch_size, time_budget)
+    return result
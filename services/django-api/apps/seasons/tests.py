@@ -0,0 +1,148 @@
+"""
+Season rollover alongside match results.
+
+Needs PostgreSQL and Redis, as the rollover and ``game_result`` use both.
+"""
+import threading
+import time
+import uuid
+import orjson
+from unittest import mock
+from django.db import connection, connections
+from django.test import Client, TransactionTestCase, override_settings
+from apps.game import views as game_views
+from apps.users.models import User
+from .models import Season, SeasonResult
+from . import rollover
+from .rollover import begin_rollover, run_rollover
+
+GAME_SERVER_TOKEN = 'test-game-server'
+
+
+@override_settings(
+    GAME_SERVER_TOKEN=GAME_SERVER_TOKEN,
+    SEASON_RESET_TARGET_ELO=1000,
+    SEASON_RESET_KEEP=0.5,
+    SEASON_ROLLOVER_SLEEP_SECONDS=0,
+)
+class RolloverWithMatchesTests(TransactionTestCase):
+
+    def setUp(self):
+        if not Season.objects.filter(status=Season.STATUS_ACTIVE).exists():
+            Season.objects.create(number=1, name='Season 1')
+        self.player = User.objects.create(username='ranked', elo=1400, total_games=10)
+        self.opponent = User.objects.create(username='opponent', elo=1200, total_games=10)
+
+    def post_result(self, elo_before, elo_after):
+        body = {
+            'game_id': str(uuid.uuid4()),
+            'participants': [
+                {'user_id': self.player.id, 'elo_before': elo_before, 'elo_after': elo_after, 'is_winner': True},
+                {'user_id': self.opponent.id, 'elo_before': 1200, 'elo_after': 1200},
+            ],
+        }
+        return Client().post(
+            '/api/game/result/', orjson.dumps(body), content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {GAME_SERVER_TOKEN}',
+        )
+
+    def elo(self):
+        return User.objects.values_list('elo', flat=True).get(pk=self.player.pk)
+
+    def test_match_reported_after_reset_keeps_reset(self):
+        # The game server computed elo_after from the rating before the reset
+        begin_rollover()
+        run_rollover()
+        self.assertEqual(self.elo(), 1200)
+
+        self.assertEqual(self.post_result(1400, 1416).status_code, 200)
+        self.assertEqual(self.elo(), 1216)
+
+    def test_match_after_season_end_counts_toward_next_season(self):
+        season = begin_rollover()
+        self.post_result(1400, 1416)
+        run_rollover()
+
+        result = SeasonResult.objects.get(season=season, user=self.player)
+        self.assertEqual(result.final_elo, 1400)
+        self.assertEqual(result.reset_elo, 1200)
+        self.assertEqual(self.elo(), 1216)
+
+    def test_match_result_concurrent_with_reset_chunk(self):
+        # The match result holds the player's row lock; the reset waits for it
+        self._race(hold='result')
+
+    def test_reset_chunk_concurrent_with_match_result(self):
+        # The reset chunk holds the player's row lock; the result waits for it
+        self._race(hold='reset')
+
+    def _race(self, hold):
+        season = begin_rollover()
+        # Snapshot and rank only, leaving the reset to run against the match
+        while Season.objects.get(pk=season.pk).rollover_phase != Season.PHASE_RESET:
+            run_rollover(batch_size=1, time_budget=0.001)
+
+        # Hold one side's transaction open after it has updated the player,
+        # then start the other side and wait until it blocks on the row lock
+        updated = threading.Event()
+        release = threading.Event()
+
+        def blocking(function):
+            def wrapper(*args):
+                result = function(*args)
+                updated.set()
+                release.wait(10)
+                return result
+            return wrapper
+
+        responses = []
+
+        def report():
+            try:
+                responses.append(self.post_result(1400, 1416))
+            finally:
+                connections.close_all()
+
+        def reset():
+            try:
+                run_rollover()
+            finally:
+                connections.close_all()
+
+        if hold == 'result':
+            # grant() runs after the player's update, in the same transaction
+            patch = mock.patch.object(game_views, 'grant', blocking(game_views.grant))
+            first, second = report, reset
+        else:
+            chunks = {**rollover._CHUNKS, Season.PHASE_RESET: blocking(rollover._reset_chunk)}
+            patch = mock.patch.object(rollover, '_CHUNKS', chunks)
+            first, second = reset, report
+
+        with patch:
+            threads = [threading.Thread(target=first), threading.Thread(target=second)]
+            threads[0].start()
+            self.assertTrue(updated.wait(10))
+            threads[1].start()
+            self.assertTrue(self._wait_for_lock_wait())
+            release.set()
+            for thread in threads:
+                thread.join(10)
+
+        self.assertEqual(responses[0].status_code, 200)
+        result = SeasonResult.objects.get(season=season, user=self.player)
+        self.assertEqual((result.final_elo, result.reset_elo), (1400, 1200))
+        self.assertEqual(self.elo(), 1216)
+        self.assertEqual(Season.objects.get(pk=season.pk).status, Season.STATUS_CLOSED)
+
+    def _wait_for_lock_wait(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+                )
+                if cursor.fetchone()[0]:
+                    return True
+            time.sleep(0.01)
+        return False
@@ -0,0 +1,79 @@
+"""
+Admin for users.
+"""
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.core.admin import LargeTableAdmin, in_batches
+from .cache import invalidate_public_profiles
+from .models import User
+
+
+@admin.register(User)
+class UserAdmin(LargeTableAdmin, BaseUserAdmin):
+    """
+    Users changelist that stays fast on millions of rows.
+
+    Search is a case-insensitive username prefix (served by
+    ``users_username_upper_like``) or an exact id; the list is ordered by id.
+    """
+    list_display = ('id', 'username', 'display_name', 'is_guest', 'elo', 'total_games', 'is_active', 'created_at')
+    list_display_links = ('id', 'username')
+    list_filter = ('is_guest', 'is_active', 'is_staff')
+    search_fields = ('^username',)
+    ordering = ('-id',)
+    sortable_by = ('id',)
+    readonly_fields = ('last_login', 'date_joined', 'created_at', 'updated_at')
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('Game', {'fields': ('elo', 'xp', 'total_games', 'wins')}),
+        ('Guest', {'fields': ('is_guest', 'display_name', 'session_expires_at')}),
+        ('Timestamps', {'fields': ('created_at', 'updated_at')}),
+    )
+    actions = ('deactivate_users', 'expire_guest_sessions', 'delete_users')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        transaction.on_commit(lambda: invalidate_public_profiles([obj.pk]))
+
+    @admin.action(description='Deactivate selected users', permissions=['change'])
+    def deactivate_users(self, request, queryset):
+        updated = 0
+        for ids in in_batches(queryset):
+            updated += User.objects.filter(id__in=ids, is_active=True).update(
+                is_active=False, updated_at=timezone.now()
+            )
+            invalidate_public_profiles(ids)
+        self.message_user(request, f'Deactivated {updated} users.')
+
+    @admin.action(description='Expire sessions of selected guests', permissions=['change'])
+    def expire_guest_sessions(self, request, queryset):
+        """Leave the guests to ``cleanup_expired_guests`` instead of deleting them here."""
+        updated = 0
+        now = timezone.now()
+        for ids in in_batches(queryset.filter(is_guest=True)):
+            updated += User.objects.filter(id__in=ids).update(session_expires_at=now, updated_at=now)
+        self.message_user(request, f'Expired {updated} guest sessions.')
+
+    @admin.action(description='Delete selected users (batched)', permissions=['delete'])
+    def delete_users(self, request, queryset):
+        """
+        Delete in chunks with raw SQL, one transaction per chunk, removing
+        dependent rows the same way as the guest cleanup task.
+        """
+        # Imported here so loading the admin does not import celery
+        from .tasks import _cascade_statements
+
+        users_table = connection.ops.quote_name(User._meta.db_table)
+        cascades = _cascade_statements()
+        deleted = 0
+        for ids in in_batches(queryset):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {users_table} WHERE id = ANY(%s) RETURNING id', [ids])
+                deleted_ids = [row[0] for row in cursor.fetchall()]
+                if deleted_ids:
+                    for statement in cascades:
+                        cursor.execute(statement, [deleted_ids])
+            invalidate_public_profiles(deleted_ids)
+            deleted += len(deleted_ids)
+        self.message_user(request, f'Deleted {deleted} users.')
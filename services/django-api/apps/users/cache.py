@@ -0,0 +1,122 @@
+"""
+Read-through Redis cache for public user profiles.
+"""
+import json
+import logging
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from whoosh_api.redis_client import get_async_redis, get_redis
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_PROFILE_FIELDS = ('id', 'username', 'display_name', 'elo', 'is_guest')
+
+
+def profile_cache_key(user_id):
+    """Redis key holding the cached public profile of a user."""
+    return f'users:profile:{user_id}'
+
+
+def public_profile(user):
+    """Compact public representation of a user, safe to show other players."""
+    return {
+        'id': user.id,
+        'username': user.username,
+        'display_name': user.display_name,
+        'elo': user.elo,
+        'is_guest': user.is_guest,
+    }
+
+
+def get_public_profiles(user_ids):
+    """
+    Return ``{user_id: profile}`` for every active user among ``user_ids``.
+
+    Profiles are read from Redis with a single MGET; misses are loaded with one
+    ``IN`` query and written back with a per-key TTL. Ids of users that do not
+    exist or are deactivated are simply absent from the result. Redis errors degrade to a database read.
+    """
+    if not user_ids:
+        return {}
+
+    r = get_redis()
+    try:
+        cached = r.mget([profile_cache_key(user_id) for user_id in user_ids])
+    except redis.RedisError:
+        logger.warning('Profile cache read failed, falling back to database', exc_info=True)
+        cached = [None] * len(user_ids)
+
+    profiles, misses = _split_cached(user_ids, cached)
+    if misses:
+        loaded = _load_profiles(misses)
+        profiles.update(loaded)
+        if loaded:
+            try:
+                _store_profiles(r.pipeline(transaction=False), loaded).execute()
+            except redis.RedisError:
+                logger.warning('Profile cache write failed', exc_info=True)
+
+    return profiles
+
+
+async def aget_public_profiles(user_ids):
+    """Async variant of ``get_public_profiles`` on ``redis.asyncio``; misses hit the ORM in a thread."""
+    if not user_ids:
+        return {}
+
+    r = get_async_redis()
+    try:
+        cached = await r.mget([profile_cache_key(user_id) for user_id in user_ids])
+    except redis.RedisError:
+        logger.warning('Profile cache read failed, falling back to database', exc_info=True)
+        cached = [None] * len(user_ids)
+
+    profiles, misses = _split_cached(user_ids, cached)
+    if misses:
+        loaded = await sync_to_async(_load_profiles)(misses)
+        profiles.update(loaded)
+        if loaded:
+            try:
+                await _store_profiles(r.pipeline(transaction=False), loaded).execute()
+            except redis.RedisError:
+                logger.warning('Profile cache write failed', exc_info=True)
+
+    return profiles
+
+
+def _split_cached(user_ids, cached):
+    """Decode MGET results into ``(profiles, missing_ids)``."""
+    profiles = {}
+    misses = []
+    for user_id, raw in zip(user_ids, cached):
+        if raw is None:
+            misses.append(user_id)
+        else:
+            profiles[user_id] = json.loads(raw)
+    return profiles, misses
+
+
+def _load_profiles(user_ids):
+    return {
+        user.id: public_profile(user)
+        for user in User.objects.filter(id__in=user_ids, is_active=True).only(*PUBLIC_PROFILE_FIELDS)
+    }
+
+
+def _store_profiles(pipe, profiles):
+    ttl = settings.USER_PROFILE_CACHE_TTL
+    for user_id, profile in profiles.items():
+        pipe.set(profile_cache_key(user_id), json.dumps(profile), ex=ttl)
+    return pipe
+
+
+def invalidate_public_profiles(user_ids):
+    """Drop cached public profiles after a user's public fields change or the user is deactivated."""
+    if not user_ids:
+        return
+    try:
+        get_redis().delete(*[profile_cache_key(user_id) for user_id in user_ids])
+    except redis.RedisError:
+        logger.warning('Profile cache invalidation failed', exc_info=True)
@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-19 09:58
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; it keeps the
+    # users table writable while the index builds.
+    atomic = False
+
+    dependencies = [
+        ('users', '0002_user_guest_fields'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('username', models.TextField())), name='text_pattern_ops'), name='users_username_upper_like'),
+        ),
+    ]
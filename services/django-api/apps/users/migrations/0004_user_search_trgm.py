@@ -0,0 +1,26 @@
+# Generated by Django 5.0 on 2026-10-19 10:10
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0003_user_username_upper_like'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(condition=models.Q(('is_active', True), ('is_guest', False)), fields=['username'], name='users_username_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(condition=models.Q(('is_active', True), ('is_guest', False)), fields=['display_name'], name='users_display_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -3,6 +3,8 @@ User models for Whoosh.
 """
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Cast, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 
 
 class User(AbstractUser):
@@ -23,5 +25,19 @@ class User(AbstractUser):
         db_table = 'users'
         indexes = [
             models.Index(fields=['is_guest', 'session_expires_at']),
+            # Serves username__istartswith, i.e. UPPER(username::text) LIKE 'ABC%'
+            models.Index(
+                OpClass(Upper(Cast('username', models.TextField())), name='text_pattern_ops'),
+                name='users_username_upper_like',
+            ),
+            # Fuzzy player search (apps.users.search); guests are never searched
+            GinIndex(
+                fields=['username'], opclasses=['gin_trgm_ops'],
+                condition=models.Q(is_guest=False, is_active=True), name='users_username_trgm',
+            ),
+            GinIndex(
+                fields=['display_name'], opclasses=['gin_trgm_ops'],
+                condition=models.Q(is_guest=False, is_active=True), name='users_display_name_trgm',
+            ),
         ]
 
@@ -0,0 +1,98 @@
+"""
+Player search by username and display name.
+
+Only active registered players are searched; guests and deactivated accounts
+never show up. A query runs in two steps, each on its own index:
+
+- the prefix fast path: an exact or case-insensitive username prefix match on
+  ``users_username_upper_like``, which answers "type the start of a name";
+- if that leaves room and the query has at least ``TRIGRAM_MIN_LENGTH``
+  characters, fuzzy and substring matches on the partial ``pg_trgm`` GIN
+  indexes over ``username`` and ``display_name``, ranked by word similarity.
+
+Results are cached in Redis for ``USER_SEARCH_CACHE_TTL`` seconds per query.
+"""
+import hashlib
+import json
+import logging
+import redis
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q
+from django.db.models.functions import Greatest
+from whoosh_api.redis_client import get_redis
+from .cache import PUBLIC_PROFILE_FIELDS, public_profile
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_LENGTH = 150
+# pg_trgm extracts too few trigrams from shorter strings to be selective
+TRIGRAM_MIN_LENGTH = 3
+
+
+def normalize_query(query):
+    """Lower-case, trim and collapse whitespace so equivalent queries share a cache entry."""
+    return ' '.join(query.split()).lower()[:SEARCH_MAX_LENGTH]
+
+
+def search_cache_key(query, limit):
+    """Redis key caching the results of one normalized query."""
+    digest = hashlib.sha1(query.encode()).hexdigest()
+    return f'users:search:{limit}:{digest}'
+
+
+def _prefix_matches(query, limit):
+    """Exact username first, then other names starting with ``query``, shortest first."""
+    players = User.objects.filter(is_guest=False, is_active=True).only(*PUBLIC_PROFILE_FIELDS)
+    exact = players.filter(username__iexact=query)
+    # Unordered, so the index scan stops after ``limit`` rows however common the prefix
+    prefixed = players.filter(username__istartswith=query)[:limit]
+    users = {user.id: user for user in exact.union(prefixed, all=True)}
+    return sorted(
+        users.values(),
+        key=lambda user: (user.username.lower() != query, len(user.username), user.username.lower()),
+    )[:limit]
+
+
+def _trigram_matches(query, limit, exclude_ids):
+    """Names containing something close to ``query``, best match first."""
+    return list(
+        User.objects.filter(is_guest=False, is_active=True)
+        .filter(Q(username__trigram_word_similar=query) | Q(display_name__trigram_word_similar=query))
+        .exclude(id__in=exclude_ids)
+        .annotate(rank=Greatest(
+            TrigramWordSimilarity(query, 'username'),
+            TrigramWordSimilarity(query, 'display_name'),
+        ))
+        .only(*PUBLIC_PROFILE_FIELDS)
+        .order_by('-rank', 'id')[:limit]
+    )
+
+
+def search_players(query, limit):
+    """
+    Return up to ``limit`` public profiles of registered players matching the
+    normalized ``query``. Redis errors degrade to an uncached search.
+    """
+    key = search_cache_key(query, limit)
+    r = get_redis()
+    try:
+        cached = r.get(key)
+    except redis.RedisError:
+        logger.warning('Search cache read failed', exc_info=True)
+        cached = None
+    if cached is not None:
+        return json.loads(cached)
+
+    users = _prefix_matches(query, limit)
+    if len(users) < limit and len(query) >= TRIGRAM_MIN_LENGTH:
+        users += _trigram_matches(query, limit - len(users), [user.id for user in users])
+    results = [public_profile(user) for user in users]
+
+    try:
+        r.set(key, json.dumps(results), ex=settings.USER_SEARCH_CACHE_TTL)
+    except redis.RedisError:
+        logger.warning('Search cache write failed', exc_info=True)
+    return results
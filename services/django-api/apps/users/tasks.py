@@ -1,29 +1,122 @@
 """
 Celery tasks for user management.
 """
+import time
 from celery import shared_task
+from django.conf import settings
+from django.db import connection, models, transaction
 from django.utils import timezone
+from whoosh_api.metrics import observe_task
 from .models import User
 
 
+def _cascade_statements():
+    """
+    Build the SQL that removes rows depending on a batch of deleted users.
+
+    Mirrors what Django's collector would do for ``User`` (M2M through tables,
+    CASCADE and SET_NULL reverse foreign keys) without loading any rows.
+    Each statement takes a single ``%s`` parameter: the list of user ids.
+    """
+    quote = connection.ops.quote_name
+    statements = []
+
+    for field in User._meta.many_to_many:
+        through = field.remote_field.through._meta
+        statements.append(
+            f'DELETE FROM {quote(through.db_table)} '
+            f'WHERE {quote(field.m2m_column_name())} = ANY(%s)'
+        )
+
+    for relation in User._meta.related_objects:
+        if relation.many_to_many or not relation.field.concrete:
+            continue
+        related_table = quote(relation.related_model._meta.db_table)
+        column = quote(relation.field.column)
+        if relation.on_delete is models.CASCADE:
+            statements.append(f'DELETE FROM {related_table} WHERE {column} = ANY(%s)')
+        elif relation.on_delete is models.SET_NULL:
+            statements.append(f'UPDATE {related_table} SET {column} = NULL WHERE {column} = ANY(%s)')
+
+    return statements
+
+
 @shared_task
-def cleanup_expired_guests():
-    """Delete expired guest accounts and their associated data."""
+@observe_task
+def cleanup_expired_guests(batch_size=None, time_budget=None):
+    """
+    Delete expired guest accounts and their associated data.
+
+    Walks the ``(is_guest, session_expires_at)`` index in keyset order and
+    deletes each chunk with raw ``DELETE ... WHERE id = ANY(...)`` statements in
+    its own short transaction, sleeping between chunks. When the time budget
+    runs out the task stops; the next run resumes from the oldest guests still
+    left, since everything before them has already been deleted.
+    """
+    batch_size = batch_size or settings.GUEST_CLEANUP_BATCH_SIZE
+    time_budget = time_budget or settings.GUEST_CLEANUP_TIME_BUDGET
+    pause = settings.GUEST_CLEANUP_SLEEP_SECONDS
+
     now = timezone.now()
-    
-    # Find all expired guest accounts
-    expired_guests = User.objects.filter(
-        is_guest=True,
-        session_expires_at__lt=now
-    )
-    
-    count = expired_guests.count()
-    
-    # Delete expired guests (this will cascade delete any related data)
-    expired_guests.delete()
-    
+    started = time.monotonic()
+    users_table = connection.ops.quote_name(User._meta.db_table)
+    cascades = _cascade_statements()
+
+    deleted = 0
+    batches = 0
+    cursor_key = None  # (session_expires_at, id) of the last row seen
+    complete = False
+
+    while True:
+        expired = User.objects.filter(is_guest=True, session_expires_at__lt=now)
+        if cursor_key is not None:
+            expires_at, last_id = cursor_key
+            expired = expired.filter(
+                models.Q(session_expires_at__gt=expires_at)
+                | models.Q(session_expires_at=expires_at, id__gt=last_id)
+            )
+        chunk = list(
+            expired.order_by('session_expires_at', 'id')
+            .values_list('session_expires_at', 'id')[:batch_size]
+        )
+        if not chunk:
+            complete = True
+            break
+
+        cursor_key = chunk[-1]
+        ids = [user_id for _, user_id in chunk]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Re-check the predicate so a guest converted since the SELECT survives.
+            # Foreign keys are deferred, so dependants can go after their users.
+            cursor.execute(
+                f'DELETE FROM {users_table} '
+                f'WHERE id = ANY(%s) AND is_guest AND session_expires_at < %s '
+                f'RETURNING id',
+                [ids, now]
+            )
+            deleted_ids = [row[0] for row in cursor.fetchall()]
+            if deleted_ids:
+                for statement in cascades:
+                    cursor.execute(statement, [deleted_ids])
+
+        deleted += len(deleted_ids)
+        batches += 1
+
+        if len(chunk) < batch_size:
+            complete = True
+            break
+        if time.monotonic() - started + pause >= time_budget:
+            break
+        time.sleep(pause)
+
+    elapsed = time.monotonic() - started
+
     return {
-        'deleted_count': count,
+        'deleted_count': deleted,
+        'batches': batches,
+        'complete': complete,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(deleted / elapsed, 1) if elapsed else 0.0,
         'timestamp': now.isoformat()
     }
-
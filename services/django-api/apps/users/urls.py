@@ -1,10 +1,13 @@
 """
 URL configuration for users app.
 """
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
     path('me/', views.user_profile, name='user-profile'),
+    path('search/', views.search_users, name='user-search'),
+    path('batch/', views.batch_profiles_async if settings.ASYNC_VIEWS else views.batch_profiles, name='user-batch'),
 ]
 
@@ -1,24 +1,123 @@
 """
 User views.
 """
+from django.conf import settings
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from whoosh_api.async_views import async_api_view, json_response, request_data
+from whoosh_api.db_router import pin_to_writer, replica_reads
+from .cache import aget_public_profiles, get_public_profiles, invalidate_public_profiles
 from .models import User
-from .serializers import UserSerializer
+from .search import SEARCH_MIN_LENGTH, normalize_query, search_players
+from .serializers import UserSerializer, serialize_user
 
 
+@replica_reads
 @api_view(['GET', 'PATCH'])
 def user_profile(request):
     """Get or update current user profile."""
     if request.method == 'GET':
-        serializer = UserSerializer(request.user)
-        return Response(serializer.data)
+        return Response(serialize_user(request.user))
     
     elif request.method == 'PATCH':
         serializer = UserSerializer(request.user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            pin_to_writer([request.user.id])
+            invalidate_public_profiles([request.user.id])
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+def _batch_ids(request_method, query_params, data):
+    """
+    Extract the requested user ids for a batch lookup.
+
+    Ids come from ``?ids=1,2,3`` on GET or ``{"ids": [1, 2, 3]}`` on POST.
+    Returns them de-duplicated in request order; raises ``ValueError`` with a
+    client-facing message when the input is invalid.
+    """
+    if request_method == 'GET':
+        raw_ids = query_params.get('ids', '')
+        raw_ids = [value for value in raw_ids.split(',') if value.strip()]
+    else:
+        raw_ids = data.get('ids', [])
+        if not isinstance(raw_ids, list):
+            raise ValueError('ids must be a list')
+
+    try:
+        user_ids = list(dict.fromkeys(int(value) for value in raw_ids))
+    except (TypeError, ValueError):
+        raise ValueError('ids must be integers')
+
+    if not user_ids:
+        raise ValueError('At least one id is required')
+
+    if len(user_ids) > settings.USER_BATCH_MAX_IDS:
+        raise ValueError(f'At most {settings.USER_BATCH_MAX_IDS} ids are allowed')
+
+    return user_ids
+
+
+def _batch_response_data(user_ids, profiles):
+    return {
+        'results': [profiles[user_id] for user_id in user_ids if user_id in profiles],
+        'missing': [user_id for user_id in user_ids if user_id not in profiles],
+    }
+
+
+@replica_reads(methods=('GET', 'POST'))
+@api_view(['GET', 'POST'])
+def batch_profiles(request):
+    """
+    Get public profiles for many users at once (e.g. a whole lobby).
+
+    Unknown ids and deactivated users are reported in ``missing`` instead of
+    failing the request.
+    """
+    try:
+        user_ids = _batch_ids(request.method, request.query_params, request.data)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    profiles = get_public_profiles(user_ids)
+    return Response(_batch_response_data(user_ids, profiles))
+
+
+@replica_reads(methods=('GET', 'POST'))
+@async_api_view(['GET', 'POST'])
+async def batch_profiles_async(request):
+    """Async ``batch_profiles`` for ASGI deployments (Redis MGET on ``redis.asyncio``)."""
+    try:
+        data = request_data(request) if request.method == 'POST' else {}
+        user_ids = _batch_ids(request.method, request.GET, data)
+    except ValueError as e:
+        return json_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    profiles = await aget_public_profiles(user_ids)
+    return json_response(_batch_response_data(user_ids, profiles))
+
+
+@replica_reads
+@api_view(['GET'])
+def search_users(request):
+    """
+    Find registered players by username or display name: ``?q=<text>``.
+
+    Optional ``limit`` (at most ``USER_SEARCH_MAX_RESULTS``). Guests are never
+    returned.
+    """
+    query = normalize_query(request.query_params.get('q', ''))
+    if len(query) < SEARCH_MIN_LENGTH:
+        return Response(
+            {'error': f'q must be at least {SEARCH_MIN_LENGTH} characters'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = int(request.query_params.get('limit', settings.USER_SEARCH_MAX_RESULTS))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, settings.USER_SEARCH_MAX_RESULTS))
+
+    return Response({'results': search_players(query, limit)})
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the Django API.
+
+Run from ``services/django-api``, e.g. ``python -m benchmarks.bench_json``.
+"""
@@ -0,0 +1,114 @@
+"""
+Benchmark: economy ledger write throughput.
+
+Against the configured Postgres and Redis (e.g. docker-compose), measures
+reward grants written one row per statement, one match (8 rows) per
+statement and in large bursts, then concurrent spends through the Redis
+debit script. Checks that no balance went negative and that hot balances
+match the ledger. Creates ``bench_economy_*`` users and removes their
+ledger rows afterwards.
+
+    python -m benchmarks.bench_economy [--users 2000] [--matches 500] [--threads 16]
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'whoosh_api.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import close_old_connections  # noqa: E402
+
+from apps.economy.ledger import (  # noqa: E402
+    Grant, InsufficientFunds, balance_key, db_balances, debit, get_balances, grant,
+)
+from apps.economy.models import BalanceSnapshot, LedgerEntry  # noqa: E402
+from apps.users.models import User  # noqa: E402
+from whoosh_api.redis_client import get_redis  # noqa: E402
+
+PLAYERS_PER_MATCH = 8
+
+
+def bench_users(count):
+    names = [f'bench_economy_{i}' for i in range(count)]
+    existing = set(User.objects.filter(username__in=names).values_list('username', flat=True))
+    User.objects.bulk_create([User(username=name) for name in names if name not in existing])
+    return list(User.objects.filter(username__in=names).order_by('id').values_list('id', flat=True))
+
+
+def reset(user_ids):
+    LedgerEntry.objects.filter(user_id__in=user_ids).delete()
+    BalanceSnapshot.objects.filter(user_id__in=user_ids).delete()
+    get_redis().delete(*[balance_key(user_id, 'coins') for user_id in user_ids])
+
+
+def match_grants(user_ids, matches, tag):
+    grants = []
+    for match in range(matches):
+        players = [user_ids[(match * PLAYERS_PER_MATCH + i) % len(user_ids)] for i in range(PLAYERS_PER_MATCH)]
+        key = f'bench:{tag}:{match}'
+        grants.append([Grant(user_id, 10, LedgerEntry.KIND_REWARD, key, currency='coins') for user_id in players])
+    return grants
+
+
+def timed(label, rows, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f'{label:<34}{rows:>8} rows {elapsed:>8.2f}s {rows / elapsed:>10.0f} rows/s')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Economy ledger throughput.')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--matches', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--spends', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    user_ids = bench_users(args.users)
+    reset(user_ids)
+    # Cache every balance so grants take the INCRBY path as they would in production
+    for user_id in user_ids:
+        get_balances(user_id, ['coins'])
+
+    rows = args.matches * PLAYERS_PER_MATCH
+    one_by_one = [g for match in match_grants(user_ids, args.matches, 'row') for g in match]
+    timed('grant, one row per statement', rows, lambda: [grant([g]) for g in one_by_one])
+
+    per_match = match_grants(user_ids, args.matches, 'match')
+    timed('grant, one match per statement', rows, lambda: [grant(match) for match in per_match])
+
+    burst = [g for match in match_grants(user_ids, args.matches, 'burst') for g in match]
+    timed('grant, whole burst at once', rows, lambda: grant(burst))
+    timed('grant, burst replayed (no-op)', rows, lambda: grant(burst))
+
+    def spend(i):
+        try:
+            debit(user_ids[i % len(user_ids)], 7, LedgerEntry.KIND_SPEND, f'bench:spend:{i}:{uuid.uuid4()}')
+        except InsufficientFunds:
+            pass
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        timed(f'debit, {args.threads} threads', args.spends, lambda: list(pool.map(spend, range(args.spends))))
+
+    cached = get_redis().mget([balance_key(user_id, 'coins') for user_id in user_ids])
+    ledger = db_balances([(user_id, 'coins') for user_id in user_ids])
+    negative = [user_id for user_id, value in zip(user_ids, cached) if int(value) < 0]
+    mismatched = [user_id for user_id, value in zip(user_ids, cached) if int(value) != ledger[user_id, 'coins']]
+    print(f'negative balances: {len(negative)}, hot balances differing from ledger: {len(mismatched)}')
+
+    reset(user_ids)
+    return 1 if negative or mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
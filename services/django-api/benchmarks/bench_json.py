@@ -0,0 +1,128 @@
+"""
+Microbenchmark: stdlib JSON + ModelSerializer vs orjson + precompiled serializers.
+
+Renders the hot API payloads (profile, lobby profiles, tokens, match history)
+and parses a game result both ways, checks the bytes are identical and reports
+the CPU time per call. No database or Redis is needed.
+
+    python -m benchmarks.bench_json [--number 20000]
+"""
+import argparse
+import io
+import os
+import sys
+import timeit
+import uuid
+from datetime import timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'whoosh_api.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import orjson  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from apps.auth.views import token_response_data  # noqa: E402
+from apps.users.cache import public_profile  # noqa: E402
+from apps.users.models import User  # noqa: E402
+from apps.users.serializers import UserSerializer, serialize_user  # noqa: E402
+from whoosh_api.parsers import ORJSONParser  # noqa: E402
+from whoosh_api.renderers import ORJSONRenderer  # noqa: E402
+
+
+def make_user(user_id):
+    return User(
+        id=user_id,
+        username=f'player_{user_id}',
+        email=f'player_{user_id}@example.com',
+        elo=1000 + user_id,
+        xp=250 * user_id,
+        total_games=40,
+        wins=12,
+        created_at=timezone.now() - timedelta(days=user_id),
+        is_guest=user_id % 3 == 0,
+        display_name=f'Plâyer {user_id} ✨' if user_id % 2 else None,
+    )
+
+
+def history_rows():
+    now = timezone.now()
+    return [
+        {
+            'match_id': str(uuid.uuid4()),
+            'started_at': (now - timedelta(minutes=10 * i)).isoformat(),
+            'ended_at': (now - timedelta(minutes=10 * i - 5)).isoformat(),
+            'elo_before': 1000 + i,
+            'elo_after': 1010 + i,
+            'xp_gained': 100,
+            'is_winner': i % 2 == 0,
+        }
+        for i in range(20)
+    ]
+
+
+def result_body():
+    return orjson.dumps({
+        'game_id': str(uuid.uuid4()),
+        'winner_id': '1',
+        'participants': [
+            {
+                'user_id': str(i),
+                'elo_before': 1000,
+                'elo_after': 1016 if i == 1 else 995,
+                'xp_gained': 100,
+                'is_winner': i == 1,
+            }
+            for i in range(1, 9)
+        ],
+    })
+
+
+def bench(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=20000, help='calls per timing run')
+    args = parser.parse_args(argv)
+
+    stdlib, fast = JSONRenderer(), ORJSONRenderer()
+    user = make_user(7)
+    lobby = [make_user(i) for i in range(1, 9)]
+    tokens = token_response_data(user, 'r' * 600, 'a' * 600)
+    history = history_rows()
+
+    render_cases = [
+        ('profile', lambda: stdlib.render(UserSerializer(user).data),
+                    lambda: fast.render(serialize_user(user))),
+        ('lobby profiles (8)', lambda: stdlib.render({'results': [public_profile(u) for u in lobby], 'missing': []}),
+                               lambda: fast.render({'results': [public_profile(u) for u in lobby], 'missing': []})),
+        ('tokens', lambda: stdlib.render(tokens), lambda: fast.render(tokens)),
+        ('history (20)', lambda: stdlib.render(history), lambda: fast.render(history)),
+    ]
+
+    body = result_body()
+    context = {'encoding': 'utf-8'}
+    parse_cases = [
+        ('game result parse', lambda: JSONParser().parse(io.BytesIO(body), parser_context=context),
+                              lambda: ORJSONParser().parse(io.BytesIO(body), parser_context=context)),
+    ]
+
+    failures = 0
+    print(f'{"payload":<22}{"stdlib µs":>12}{"fast µs":>12}{"speedup":>10}  identical')
+    for name, baseline, candidate in render_cases + parse_cases:
+        identical = baseline() == candidate()
+        failures += not identical
+        before, after = bench(baseline, args.number), bench(candidate, args.number)
+        print(f'{name:<22}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x  {"yes" if identical else "NO"}')
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
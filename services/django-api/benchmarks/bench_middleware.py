@@ -0,0 +1,104 @@
+"""
+Microbenchmark: per-request middleware overhead on API paths.
+
+Builds two WSGI handlers in-process, one with the lean API pipeline
+(``BrowserOnlyMiddleware``) and one with the browser middleware inlined in
+``MIDDLEWARE`` as before, and times the same API request through both. The
+view is ``/api/health/`` by default, so the difference is middleware cost.
+No database or Redis is needed.
+
+    python -m benchmarks.bench_middleware [--number 20000] [--path /api/health/]
+"""
+import argparse
+import io
+import os
+import sys
+import timeit
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'whoosh_api.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+BROWSER_COOKIES = 'sessionid=8j1lq0f5z1m6x2y9w3v7u4t0s1r2q3p4; csrftoken=Vf9Qm2Lx7Rk4Tn8Wb3Yc6Zd1Ae5Hg0Ji'
+
+
+def legacy_middleware():
+    """``MIDDLEWARE`` with the browser middleware inlined, as before the lean pipeline."""
+    inlined = []
+    for path in settings.MIDDLEWARE:
+        if path == 'whoosh_api.middleware.BrowserOnlyMiddleware':
+            inlined.extend(settings.BROWSER_MIDDLEWARE)
+        else:
+            inlined.append(path)
+    return inlined
+
+
+def build_handler(middleware):
+    with override_settings(MIDDLEWARE=middleware):
+        return WSGIHandler()
+
+
+def make_environ(path, cookies):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '8000',
+        'HTTP_HOST': 'localhost',
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+    }
+    if cookies:
+        environ['HTTP_COOKIE'] = cookies
+    return environ
+
+
+def time_handler(handler, path, cookies, number):
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    def call():
+        response = handler(make_environ(path, cookies), start_response)
+        b''.join(response)
+        response.close()
+
+    for _ in range(200):
+        call()
+    return min(timeit.repeat(call, number=number, repeat=3)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Middleware overhead on API paths.')
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--path', default='/api/health/')
+    args = parser.parse_args(argv)
+
+    handlers = {
+        'full stack': build_handler(legacy_middleware()),
+        'lean /api/*': build_handler(settings.MIDDLEWARE),
+    }
+
+    print(f'GET {args.path}, {args.number} requests per run')
+    print(f'{"pipeline":<14}{"cookies":<10}{"us/request":>12}')
+    results = {}
+    for cookies_label, cookies in (('none', ''), ('browser', BROWSER_COOKIES)):
+        for name, handler in handlers.items():
+            seconds = time_handler(handler, args.path, cookies, args.number)
+            results[name, cookies_label] = seconds
+            print(f'{name:<14}{cookies_label:<10}{seconds * 1e6:>12.1f}')
+        saved = results['full stack', cookies_label] - results['lean /api/*', cookies_label]
+        print(f'{"saved":<24}{saved * 1e6:>12.1f}  ({saved / results["full stack", cookies_label]:.0%})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark: gunicorn gthread (WSGI) vs gunicorn + uvicorn workers (ASGI).
+
+Starts the API once per server mode with ``gunicorn.conf.py`` (as in the pod),
+creates a guest to get a token, then drives the Redis-bound endpoints and
+reports requests per second and p99 latency per pod. Needs the local
+Postgres/Redis from docker-compose and a Celery broker for ``join-queue``
+(e.g. ``CELERY_BROKER_URL=redis://localhost:6379/1``).
+
+    python -m benchmarks.bench_server_modes [--concurrency 64] [--duration 20]
+"""
+import argparse
+import asyncio
+import json
+import signal
+import sys
+
+from .loadgen import run_load
+from .server import create_guest, start_server, wait_ready
+
+SERVER_MODES = ('wsgi', 'asgi')
+
+ENDPOINTS = [
+    ('join-queue', 'POST', '/api/match/join/', {'queue': 'bench'}),
+    ('user-batch', 'GET', '/api/users/batch/?ids={user_id}', None),
+]
+
+
+def bench_mode(mode, port, concurrency, duration):
+    base_url = f'http://127.0.0.1:{port}'
+    server = start_server(mode, port)
+    try:
+        wait_ready(base_url)
+        token, user_id = create_guest(base_url)
+        headers = {'Authorization': f'Bearer {token}'}
+        results = {}
+        for name, method, path, body in ENDPOINTS:
+            url = base_url + path.format(user_id=user_id)
+            asyncio.run(run_load(url, method, headers, body, concurrency, duration=2))  # warm up
+            stats = asyncio.run(run_load(url, method, headers, body, concurrency, duration))
+            results[name] = stats.summary()
+        return results
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare WSGI and ASGI server modes.')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--json', help='also write the raw results to this file')
+    args = parser.parse_args(argv)
+
+    results = {mode: bench_mode(mode, args.port, args.concurrency, args.duration) for mode in SERVER_MODES}
+
+    print(f'{"endpoint":<14}{"mode":<6}{"rps":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+    for name, *_ in ENDPOINTS:
+        for mode in SERVER_MODES:
+            s = results[mode][name]
+            print(f'{name:<14}{mode:<6}{s["rps"]:>10}{s["p50_ms"]:>10}{s["p99_ms"]:>10}{s["errors"]:>8}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Minimal closed-loop HTTP/1.1 load generator.
+
+Each of ``concurrency`` workers keeps one keep-alive connection open and sends
+requests back to back for ``duration`` seconds, so throughput is bounded by the
+server, not by connection setup. Only the standard library is used.
+
+    python -m benchmarks.loadgen http://localhost:8000/api/health/ -c 64 -d 20
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+
+class Stats:
+    """Latency samples and status counts for one run."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def record(self, status, latency):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        """Throughput and latency percentiles (milliseconds)."""
+        count = len(self.latencies)
+        return {
+            'requests': count,
+            'errors': self.errors + sum(n for code, n in self.statuses.items() if code >= 500),
+            'rps': round(count / self.elapsed, 1) if self.elapsed else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p95_ms': round(self.percentile(95) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'max_ms': round(max(self.latencies, default=0.0) * 1000, 2),
+            'statuses': {str(code): n for code, n in sorted(self.statuses.items())},
+        }
+
+
+def build_request(url, method='GET', headers=None, body=None):
+    """Serialize one HTTP/1.1 request; ``body`` may be bytes, str or a JSON-able object."""
+    parts = urlsplit(url)
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+
+    if body is not None and not isinstance(body, (bytes, str)):
+        body = json.dumps(body)
+    if isinstance(body, str):
+        body = body.encode()
+
+    lines = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: keep-alive']
+    for name, value in (headers or {}).items():
+        lines.append(f'{name}: {value}')
+    if body is not None:
+        if not any(name.lower() == 'content-type' for name in (headers or {})):
+            lines.append('Content-Type: application/json')
+        lines.append(f'Content-Length: {len(body)}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + (body or b'')
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed by server')
+    status = int(status_line.split()[1])
+
+    length = None
+    chunked = False
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+        elif name == 'connection' and value == 'close':
+            keep_alive = False
+
+    body = b''
+    if chunked:
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b''.join(chunks)
+    elif length:
+        body = await reader.readexactly(length)
+    elif length is None:
+        body = await reader.read()
+        keep_alive = False
+    return status, body, keep_alive
+
+
+async def _worker(host, port, next_request, stats, deadline, remaining):
+    reader = writer = None
+    try:
+        while time.monotonic() < deadline:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            payload = next_request()
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                writer.write(payload)
+                await writer.drain()
+                status, _, keep_alive = await _read_response(reader)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                stats.errors += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                continue
+            stats.record(status, time.perf_counter() - started)
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def run_load(url, method='GET', headers=None, body=None, concurrency=32,
+                   duration=10.0, requests=None, request_factory=None):
+    """
+    Drive ``url`` with ``concurrency`` keep-alive connections and return ``Stats``.
+
+    Stops after ``duration`` seconds or ``requests`` requests, whichever is first.
+    ``request_factory`` (a zero-argument callable returning request bytes) can be
+    used instead of a fixed method/body to vary each request.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    if request_factory is None:
+        payload = build_request(url, method, headers, body)
+        request_factory = lambda: payload  # noqa: E731
+
+    stats = Stats()
+    remaining = [requests] if requests is not None else None
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(host, port, request_factory, stats, deadline, remaining)
+        for _ in range(concurrency)
+    ))
+    stats.elapsed = time.monotonic() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Closed-loop HTTP load generator.')
+    parser.add_argument('url')
+    parser.add_argument('-X', '--method', default='GET')
+    parser.add_argument('-H', '--header', action='append', default=[], help='"Name: value"')
+    parser.add_argument('-b', '--body', help='request body (JSON)')
+    parser.add_argument('-c', '--concurrency', type=int, default=32)
+    parser.add_argument('-d', '--duration', type=float, default=10.0)
+    parser.add_argument('-n', '--requests', type=int)
+    args = parser.parse_args(argv)
+
+    headers = dict(h.split(':', 1) for h in args.header)
+    headers = {name.strip(): value.strip() for name, value in headers.items()}
+    stats = asyncio.run(run_load(
+        args.url, args.method, headers, args.body,
+        args.concurrency, args.duration, args.requests,
+    ))
+    print(json.dumps(stats.summary(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Scenario load tests with baselines and regression checks.
+
+Drives realistic traffic against a running API (docker-compose by default):
+
+    guest-burst       many new players arriving at once
+    login-storm       registered players logging in after an outage
+    join-queue-flood  every online player hitting "play"
+    result-ingestion  8-player results posted by the game servers
+    polling           clients refreshing their profile and match history
+    player-search     friend search: username prefixes and fuzzy names
+
+For each step it records throughput, p50/p95/p99 latency, errors and database
+queries per request (read from the server's ``/metrics``). Results can be saved
+as a JSON baseline, and a later run compared against it fails (exit status 1)
+when latency, throughput, errors or query counts regress past the thresholds.
+
+    python -m benchmarks.scenarios --save-baseline benchmarks/baselines/local.json
+    python -m benchmarks.scenarios --compare benchmarks/baselines/local.json
+
+``join-queue-flood`` needs a Celery broker (docker-compose sets one) and
+``result-ingestion`` needs the game tables (``manage.py migrate``) and the
+server's ``GAME_SERVER_TOKEN`` (``--game-server-token``).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import signal
+import sys
+import time
+import uuid
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from .loadgen import build_request, run_load
+from .server import create_guest, register_user, start_server, wait_ready
+
+PLAYERS_PER_MATCH = 8
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'local.json')
+
+
+class Step:
+    """One endpoint driven within a scenario; ``view`` is its URL name in ``/metrics``."""
+
+    def __init__(self, name, view, url, request_factory, requests, concurrency):
+        self.name = name
+        self.view = view
+        self.url = url
+        self.request_factory = request_factory
+        self.requests = requests
+        self.concurrency = concurrency
+
+
+def _cycle_requests(url, method, headers_list, body=None):
+    payloads = itertools.cycle([build_request(url, method, headers, body) for headers in headers_list])
+    return lambda: next(payloads)
+
+
+def _bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+class Context:
+    """Accounts shared between scenarios, created once per run."""
+
+    def __init__(self, base_url, scale, game_server_token=None):
+        self.base_url = base_url
+        self.scale = scale
+        self.game_server_token = game_server_token
+        self.run_id = uuid.uuid4().hex[:8]
+        self.password = f'bench-{self.run_id}-Pw1!'
+        self._players = None
+        self._guests = None
+
+    def count(self, n):
+        return max(1, int(n * self.scale))
+
+    def players(self):
+        """Registered accounts: ``[(username, token, user_id), ...]``."""
+        if self._players is None:
+            names = [f'bench_{self.run_id}_{i}' for i in range(max(PLAYERS_PER_MATCH, self.count(64)))]
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                registered = pool.map(lambda name: register_user(self.base_url, name, self.password), names)
+                self._players = [(name, token, user_id) for name, (token, user_id) in zip(names, registered)]
+        return self._players
+
+    def guests(self):
+        """Guest tokens: ``[(token, user_id), ...]``."""
+        if self._guests is None:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                self._guests = list(pool.map(lambda _: create_guest(self.base_url), range(self.count(200))))
+        return self._guests
+
+
+def guest_burst(ctx):
+    url = f'{ctx.base_url}/api/auth/guest/'
+    payload = build_request(url, 'POST', body={'display_name': 'bench'})
+    return [Step('create-guest', 'create-guest', url, lambda: payload, ctx.count(500), 50)]
+
+
+def login_storm(ctx):
+    url = f'{ctx.base_url}/api/auth/login/'
+    payloads = itertools.cycle([
+        build_request(url, 'POST', body={'username': name, 'password': ctx.password})
+        for name, _, _ in ctx.players()
+    ])
+    return [Step('login', 'login', url, lambda: next(payloads), ctx.count(200), 16)]
+
+
+def join_queue_flood(ctx):
+    url = f'{ctx.base_url}/api/match/join/'
+    factory = _cycle_requests(url, 'POST', [_bearer(token) for token, _ in ctx.guests()], {'queue': 'bench'})
+    return [Step('join-queue', 'join-queue', url, factory, ctx.count(2000), 64)]
+
+
+def result_ingestion(ctx):
+    url = f'{ctx.base_url}/api/game/result/'
+    user_ids = [user_id for _, _, user_id in ctx.players()]
+    rng = random.Random(ctx.run_id)
+    headers = _bearer(ctx.game_server_token) if ctx.game_server_token else {}
+
+    def factory():
+        players = rng.sample(user_ids, PLAYERS_PER_MATCH)
+        winner = rng.randrange(PLAYERS_PER_MATCH)
+        participants = []
+        for i, user_id in enumerate(players):
+            elo_before = rng.randint(900, 1500)
+            participants.append({
+                'user_id': user_id,
+                'elo_before': elo_before,
+                'elo_after': elo_before + (16 if i == winner else -4),
+                'xp_gained': 100 if i == winner else 25,
+                'is_winner': i == winner,
+            })
+        return build_request(url, 'POST', headers,
+                             body={'game_id': str(uuid.uuid4()), 'participants': participants})
+
+    return [Step('game-result', 'game-result', url, factory, ctx.count(200), 8)]
+
+
+def polling(ctx):
+    headers = [_bearer(token) for _, token, _ in ctx.players()]
+    me_url = f'{ctx.base_url}/api/users/me/'
+    history_url = f'{ctx.base_url}/api/game/history/'
+    return [
+        Step('user-profile', 'user-profile', me_url, _cycle_requests(me_url, 'GET', headers), ctx.count(2000), 32),
+        Step('match-history', 'match-history', history_url, _cycle_requests(history_url, 'GET', headers),
+             ctx.count(2000), 32),
+    ]
+
+
+def player_search(ctx):
+    players = ctx.players()
+    headers = [_bearer(token) for _, token, _ in players]
+    names = [name for name, _, _ in players]
+    # Prefixes take the fast path; dropping a character forces a trigram match
+    queries = [name[:-1] for name in names] + [name[:5] + name[6:] for name in names]
+    url = f'{ctx.base_url}/api/users/search/'
+    payloads = itertools.cycle([
+        build_request(f'{url}?q={query}', 'GET', header) for query, header in zip(queries, itertools.cycle(headers))
+    ])
+    return [Step('user-search', 'user-search', url, lambda: next(payloads), ctx.count(2000), 32)]
+
+
+SCENARIOS = {
+    'guest-burst': guest_burst,
+    'login-storm': login_storm,
+    'join-queue-flood': join_queue_flood,
+    'result-ingestion': result_ingestion,
+    'polling': polling,
+    'player-search': player_search,
+}
+
+
+def scrape_db_queries(base_url, token=None):
+    """``{view: (query_sum, request_count)}`` from ``whoosh_http_request_db_queries``, or None."""
+    from prometheus_client.parser import text_string_to_metric_families
+
+    request = urllib.request.Request(f'{base_url}/metrics', headers=_bearer(token) if token else {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            text = response.read().decode()
+    except OSError:
+        return None
+
+    totals = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != 'whoosh_http_request_db_queries':
+            continue
+        for sample in family.samples:
+            view = sample.labels.get('view')
+            query_sum, count = totals.get(view, (0.0, 0.0))
+            if sample.name.endswith('_sum'):
+                query_sum = sample.value
+            elif sample.name.endswith('_count'):
+                count = sample.value
+            totals[view] = (query_sum, count)
+    return totals
+
+
+def _queries_per_request(before, after, view):
+    if before is None or after is None or view not in after:
+        return None
+    query_sum, count = after[view]
+    prev_sum, prev_count = before.get(view, (0.0, 0.0))
+    if count - prev_count <= 0:
+        return None
+    return round((query_sum - prev_sum) / (count - prev_count), 2)
+
+
+def run_step(step, base_url, metrics_token):
+    before = scrape_db_queries(base_url, metrics_token)
+    stats = asyncio.run(run_load(
+        step.url, concurrency=step.concurrency, duration=600,
+        requests=step.requests, request_factory=step.request_factory,
+    ))
+    after = scrape_db_queries(base_url, metrics_token)
+    summary = stats.summary()
+    summary['queries_per_request'] = _queries_per_request(before, after, step.view)
+    return summary
+
+
+def run_suite(base_url, names, scale, metrics_token=None, game_server_token=None):
+    ctx = Context(base_url, scale, game_server_token)
+    results = {}
+    for name in names:
+        for step in SCENARIOS[name](ctx):
+            print(f'  {name}/{step.name}: {step.requests} requests x {step.concurrency} connections', flush=True)
+            results[f'{name}/{step.name}'] = run_step(step, base_url, metrics_token)
+    return results
+
+
+def compare(baseline, results, latency_threshold, latency_slack_ms, query_threshold):
+    """Return human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in ('p95_ms', 'p99_ms'):
+            limit = base[metric] * (1 + latency_threshold) + latency_slack_ms
+            if current[metric] > limit:
+                regressions.append(f'{key}: {metric} {current[metric]} > {limit:.2f} (baseline {base[metric]})')
+        if current['rps'] < base['rps'] * (1 - latency_threshold):
+            regressions.append(f'{key}: rps {current["rps"]} < baseline {base["rps"]} - {latency_threshold:.0%}')
+        if current['errors'] > base['errors']:
+            regressions.append(f'{key}: errors {current["errors"]} > baseline {base["errors"]}')
+        base_queries, queries = base.get('queries_per_request'), current.get('queries_per_request')
+        if base_queries is not None and queries is not None and queries > base_queries + query_threshold:
+            regressions.append(f'{key}: queries/request {queries} > baseline {base_queries}')
+    return regressions
+
+
+def print_results(results, baseline=None):
+    baseline = baseline or {}
+    print(f'\n{"scenario/step":<34}{"reqs":>7}{"rps":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+          f'{"q/req":>7}{"errors":>8}{"p95 vs base":>13}')
+    for key, s in results.items():
+        base = baseline.get(key)
+        delta = f'{(s["p95_ms"] / base["p95_ms"] - 1):+.0%}' if base and base['p95_ms'] else ''
+        queries = '-' if s['queries_per_request'] is None else s['queries_per_request']
+        print(f'{key:<34}{s["requests"]:>7}{s["rps"]:>9}{s["p50_ms"]:>9}{s["p95_ms"]:>9}{s["p99_ms"]:>9}'
+              f'{queries:>7}{s["errors"]:>8}{delta:>13}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scenario load tests with regression checks.')
+    parser.add_argument('--base-url', default=os.getenv('BENCH_BASE_URL', 'http://localhost:8000'))
+    parser.add_argument('--start-server', choices=['wsgi', 'asgi'],
+                        help='start a local gunicorn in this mode instead of using --base-url')
+    parser.add_argument('--port', type=int, default=8100, help='port for --start-server')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='run only these scenarios (default: all, in order)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply request and account counts')
+    parser.add_argument('--metrics-token', default=os.getenv('METRICS_TOKEN'))
+    parser.add_argument('--game-server-token', default=os.getenv('GAME_SERVER_TOKEN'),
+                        help='sent by result-ingestion; must match the server\'s GAME_SERVER_TOKEN')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, metavar='PATH')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, metavar='PATH')
+    parser.add_argument('--latency-threshold', type=float, default=0.25,
+                        help='allowed p95/p99 increase and rps drop as a fraction (default 0.25)')
+    parser.add_argument('--latency-slack-ms', type=float, default=2.0,
+                        help='absolute latency slack so sub-millisecond noise does not fail the run')
+    parser.add_argument('--query-threshold', type=float, default=0.0,
+                        help='allowed increase in average queries per request (default 0)')
+    parser.add_argument('--json', help='also write the raw results to this file')
+    args = parser.parse_args(argv)
+
+    base_url = args.base_url.rstrip('/')
+    server = None
+    if args.start_server:
+        base_url = f'http://127.0.0.1:{args.port}'
+        env = {'GAME_SERVER_TOKEN': args.game_server_token} if args.game_server_token else {}
+        server = start_server(args.start_server, args.port, **env)
+    try:
+        wait_ready(base_url)
+        started = time.monotonic()
+        print(f'Running scenarios against {base_url}')
+        results = run_suite(base_url, args.scenario or list(SCENARIOS), args.scale, args.metrics_token,
+                            args.game_server_token)
+        print(f'Finished in {time.monotonic() - started:.0f}s')
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            saved = json.load(f)
+        baseline = saved['results']
+        if saved.get('scale') != args.scale:
+            print(f'warning: baseline was recorded with --scale {saved.get("scale")}, this run used {args.scale}')
+    print_results(results, baseline)
+
+    for path in filter(None, (args.save_baseline, args.json)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'base_url': base_url, 'scale': args.scale, 'results': results}, f, indent=2)
+        print(f'Wrote {path}')
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.latency_threshold, args.latency_slack_ms, args.query_threshold)
+        if regressions:
+            print('\nRegressions:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('\nNo regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
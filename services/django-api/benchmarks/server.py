@@ -0,0 +1,65 @@
+"""
+Helpers for benchmarks that drive a running API server over HTTP.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+def start_server(mode, port, **env):
+    """Start gunicorn with ``gunicorn.conf.py`` (as in the pod) on ``127.0.0.1:port``."""
+    env = dict(os.environ, SERVER_MODE=mode, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_TIMEOUT='120', **env)
+    command = [sys.executable, '-m', 'gunicorn', '--config', CONFIG]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'{base_url}/api/health/', timeout=2)
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f'server at {base_url} did not become ready')
+
+
+def request_json(url, method='GET', body=None, headers=None, timeout=30):
+    """Send one request and return ``(status, decoded JSON body or None)``."""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={
+        'Content-Type': 'application/json', **(headers or {}),
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, raw = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, raw = e.code, e.read()
+    try:
+        return status, json.loads(raw) if raw else None
+    except ValueError:
+        return status, None
+
+
+def create_guest(base_url):
+    """Create a guest and return ``(access_token, user_id)``."""
+    status, data = request_json(f'{base_url}/api/auth/guest/', 'POST', {'display_name': 'bench'})
+    if status != 201:
+        raise RuntimeError(f'guest creation failed with HTTP {status}: {data}')
+    return data['access'], data['user']['id']
+
+
+def register_user(base_url, username, password):
+    """Register a full account and return ``(access_token, user_id)``."""
+    status, data = request_json(f'{base_url}/api/auth/register/', 'POST', {
+        'username': username, 'email': f'{username}@bench.invalid', 'password': password,
+    })
+    if status != 201:
+        raise RuntimeError(f'registration of {username} failed with HTTP {status}: {data}')
+    return data['access'], data['user']['id']
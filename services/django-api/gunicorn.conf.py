@@ -0,0 +1,65 @@
+"""
+Gunicorn configuration for the Django API.
+
+Worker layout and server mode come from the environment so the same image
+serves both modes:
+
+    SERVER_MODE           wsgi (gthread, default) or asgi (uvicorn workers)
+    GUNICORN_WORKERS      worker processes per pod (default 4)
+    GUNICORN_THREADS      threads per gthread worker (default 2)
+    ASGI_MAX_CONCURRENCY  requests in flight per uvicorn worker (default 100)
+"""
+import os
+import shutil
+
+server_mode = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+accesslog = '-'
+errorlog = '-'
+
+if server_mode == 'asgi':
+    worker_class = 'whoosh_api.workers.UvicornWorker'
+    wsgi_app = 'whoosh_api.asgi:application'
+else:
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', '2'))
+    wsgi_app = 'whoosh_api.wsgi:application'
+
+# Prometheus multiprocess mode: every worker writes its samples here and
+# /metrics merges them. Emptied before the app is loaded so a restarted
+# container does not report stale workers.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Import Django and the views once in the master; workers fork with
+# everything loaded and share those pages copy-on-write.
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Fetch the JWT keys in the master, after the app is loaded and before any
+    worker forks. Not done on import, so measuring import time (``manage.py
+    importtime``) makes no AWS calls. A failure stops the server.
+    """
+    from apps.auth.keys import configure_jwt_keys
+
+    configure_jwt_keys()
+
+
+def post_worker_init(worker):
+    """Ping Redis before the worker accepts its first request."""
+    from whoosh_api.startup import warm_up_worker
+
+    warm_up_worker()
+
+
+def child_exit(server, worker):
+    """Drop the exited worker's live gauges (e.g. requests in progress)."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
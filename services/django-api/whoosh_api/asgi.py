@@ -9,3 +9,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'whoosh_api.settings')
 
 application = get_asgi_application()
 
+from whoosh_api.startup import preload  # noqa: E402
+
+preload()
+
@@ -0,0 +1,3 @@
+"""
+PostgreSQL backend for whoosh_api that records connection statistics.
+"""
@@ -0,0 +1,70 @@
+"""
+PostgreSQL database wrapper that tracks connection acquisition.
+
+Behaves exactly like ``django.db.backends.postgresql`` but times every new
+connection (a fresh TCP/TLS connect, or a checkout when a psycopg pool is
+configured), counts the connections this process holds open and reports
+every query to ``whoosh_api.metrics``. See ``connection_stats``.
+"""
+import threading
+import time
+from django.db.backends.postgresql import base
+from whoosh_api import metrics
+
+_lock = threading.Lock()
+_stats = {
+    'connects': 0,
+    'connect_errors': 0,
+    'connect_seconds_total': 0.0,
+    'connect_seconds_max': 0.0,
+    'open': 0,
+    'open_peak': 0,
+}
+
+
+def connection_stats():
+    """Snapshot of this process's connection counters."""
+    with _lock:
+        return dict(_stats)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.execute_wrappers.append(self._observe_query)
+
+    def _observe_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.observe_query(self.alias, time.perf_counter() - started, sql)
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception:
+            with _lock:
+                _stats['connect_errors'] += 1
+            raise
+        elapsed = time.perf_counter() - started
+        metrics.DB_CONNECT_SECONDS.labels(self.alias).observe(elapsed)
+        metrics.DB_CONNECTIONS_OPEN.labels(self.alias).inc()
+        with _lock:
+            _stats['connects'] += 1
+            _stats['connect_seconds_total'] += elapsed
+            _stats['connect_seconds_max'] = max(_stats['connect_seconds_max'], elapsed)
+            _stats['open'] += 1
+            _stats['open_peak'] = max(_stats['open_peak'], _stats['open'])
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        try:
+            return super()._close()
+        finally:
+            metrics.DB_CONNECTIONS_OPEN.labels(self.alias).dec()
+            with _lock:
+                _stats['open'] -= 1
@@ -0,0 +1,202 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Reads go to the writer (``default``) unless a view opts in with
+``@replica_reads``. For an opted-in request, reads are sent to the
+``replica`` alias, except when:
+
+- no replica is configured,
+- the user wrote recently (``pin_to_writer`` sets ``db:pin:{user_id}`` in Redis
+  for ``DB_REPLICA_PIN_SECONDS``), so they always see their own writes, or
+- replica lag is above ``DB_REPLICA_MAX_LAG_SECONDS`` (checked at most every
+  ``DB_REPLICA_LAG_CHECK_SECONDS`` per process), or the lag check fails.
+
+Writes always go to ``default``.
+"""
+import contextvars
+import functools
+import logging
+import threading
+import time
+import jwt
+import redis
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from .redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB_ALIAS = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = contextvars.ContextVar('whoosh_read_alias', default=DEFAULT_DB_ALIAS)
+
+_lag_lock = threading.Lock()
+_lag = {'checked_at': None, 'seconds': None, 'checking': False}
+
+
+class ReplicaRouter:
+    """Route reads to the alias chosen for the current request; writes to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so instances loaded from the replica are still saved to the writer.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def pin_key(user_id):
+    """Redis key that keeps a user's reads on the writer after a write."""
+    return f'db:pin:{user_id}'
+
+
+def pin_to_writer(user_ids):
+    """Send these users' reads to the writer for the next ``DB_REPLICA_PIN_SECONDS``."""
+    if not user_ids or REPLICA_DB_ALIAS not in settings.DATABASES:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.set(pin_key(user_id), 1, ex=settings.DB_REPLICA_PIN_SECONDS)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning('Could not pin users to the writer', exc_info=True)
+
+
+def _request_user_id(request):
+    """
+    User id from the bearer token's claims, used only to look up the pin.
+
+    The signature is not checked here; the view authenticates the token as
+    usual. A forged id can only change which database serves the forger's
+    own request.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        claims = jwt.decode(token, options={'verify_signature': False})
+    except jwt.InvalidTokenError:
+        return None
+    return claims.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))
+
+
+_STALE = object()
+
+
+def _cached_lag():
+    """Cached lag if it is still fresh, else ``_STALE``."""
+    with _lag_lock:
+        checked_at = _lag['checked_at']
+        if checked_at is not None and time.monotonic() - checked_at < settings.DB_REPLICA_LAG_CHECK_SECONDS:
+            return _lag['seconds']
+    return _STALE
+
+
+def replica_lag():
+    """
+    Replica lag in seconds, cached per process; ``None`` if it cannot be measured.
+    """
+    with _lag_lock:
+        checked_at = _lag['checked_at']
+        if checked_at is not None and time.monotonic() - checked_at < settings.DB_REPLICA_LAG_CHECK_SECONDS:
+            return _lag['seconds']
+        # Requests arriving while another one checks use the previous value
+        if _lag['checking']:
+            return _lag['seconds']
+        _lag['checking'] = True
+
+    seconds = None
+    try:
+        with connections[REPLICA_DB_ALIAS].cursor() as cursor:
+            cursor.execute(settings.DB_REPLICA_LAG_QUERY)
+            row = cursor.fetchone()
+        seconds = float(row[0]) if row and row[0] is not None else 0.0
+    except Exception:
+        logger.warning('Replica lag check failed; reading from the writer', exc_info=True)
+    finally:
+        with _lag_lock:
+            _lag['seconds'] = seconds
+            _lag['checked_at'] = time.monotonic()
+            _lag['checking'] = False
+    return seconds
+
+
+def _alias_for_lag(seconds):
+    if seconds is not None and seconds <= settings.DB_REPLICA_MAX_LAG_SECONDS:
+        return REPLICA_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+def _is_pinned(user_id):
+    if user_id is None:
+        return False
+    try:
+        return bool(get_redis().exists(pin_key(user_id)))
+    except redis.RedisError:
+        return True
+
+
+async def _ais_pinned(user_id):
+    if user_id is None:
+        return False
+    try:
+        return bool(await get_async_redis().exists(pin_key(user_id)))
+    except redis.RedisError:
+        return True
+
+
+def replica_reads(view=None, *, methods=SAFE_METHODS):
+    """
+    Let a read-only view read from the replica.
+
+    Only requests whose method is in ``methods`` are routed; pass e.g.
+    ``methods=('GET', 'POST')`` for lookups that take their input as a POST
+    body. Apply it outermost (above ``@api_view``) so authentication's user
+    lookup is routed too. Works for sync and async views.
+    """
+    if view is None:
+        return functools.partial(replica_reads, methods=methods)
+
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapped(request, *args, **kwargs):
+            if request.method not in methods or REPLICA_DB_ALIAS not in settings.DATABASES:
+                return await view(request, *args, **kwargs)
+            if await _ais_pinned(_request_user_id(request)):
+                alias = DEFAULT_DB_ALIAS
+            else:
+                seconds = _cached_lag()
+                if seconds is _STALE:
+                    seconds = await sync_to_async(replica_lag)()
+                alias = _alias_for_lag(seconds)
+            token = _read_alias.set(alias)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return async_wrapped
+
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in methods or REPLICA_DB_ALIAS not in settings.DATABASES:
+            return view(request, *args, **kwargs)
+        if _is_pinned(_request_user_id(request)):
+            alias = DEFAULT_DB_ALIAS
+        else:
+            alias = _alias_for_lag(replica_lag())
+        token = _read_alias.set(alias)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapped
@@ -0,0 +1,319 @@
+"""
+Prometheus metrics for the Django API.
+
+Under gunicorn every worker writes its samples to ``PROMETHEUS_MULTIPROC_DIR``
+(set up in ``gunicorn.conf.py``) and ``/metrics`` merges all workers of the
+pod, so a scrape reflects the whole pod whichever worker answers it. Without
+that variable (``runserver``, tests) the default in-process registry is used.
+"""
+import contextvars
+import functools
+import os
+import time
+import redis
+import redis.asyncio
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+UNRESOLVED_VIEW = '<unresolved>'
+# Any other method is counted as "other", so clients cannot add label values
+HTTP_METHODS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+
+REQUEST_LATENCY = Histogram(
+    'whoosh_http_request_duration_seconds', 'Request latency by URL name.',
+    ['view', 'method', 'status'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'whoosh_http_requests_in_progress', 'Requests currently being served.',
+    multiprocess_mode='livesum',
+)
+REQUEST_DB_QUERIES = Histogram(
+    'whoosh_http_request_db_queries', 'Database queries per request by URL name.',
+    ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    'whoosh_http_request_db_seconds', 'Time spent in database queries per request by URL name.',
+    ['view'], buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter(
+    'whoosh_db_queries_total', 'Database queries by connection alias.', ['alias'],
+)
+DB_CONNECT_SECONDS = Histogram(
+    'whoosh_db_connect_seconds',
+    'Time to acquire a database connection (new connection or pool checkout).',
+    ['alias'], buckets=FAST_BUCKETS,
+)
+DB_CONNECTIONS_OPEN = Gauge(
+    'whoosh_db_connections_open', 'Database connections currently held open.', ['alias'],
+    multiprocess_mode='livesum',
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    'whoosh_redis_command_duration_seconds', 'Redis round-trip time by command (PIPELINE for pipelines).',
+    ['command'], buckets=FAST_BUCKETS,
+)
+REDIS_ERRORS = Counter(
+    'whoosh_redis_errors_total', 'Redis commands that raised an error.', ['command'],
+)
+TASK_DURATION = Histogram(
+    'whoosh_celery_task_duration_seconds', 'Celery task run time.',
+    ['task', 'outcome'], buckets=TASK_BUCKETS,
+)
+
+# Per-request database counters: [queries, seconds]. Contextvars follow the
+# request into sync_to_async threads, so async views are counted as well.
+_request_db = contextvars.ContextVar('whoosh_request_db', default=None)
+
+# Database and Redis calls of a request being profiled (whoosh_api.profiling),
+# as (kind, database alias, statement, seconds) tuples; None when not profiling.
+_request_calls = contextvars.ContextVar('whoosh_request_calls', default=None)
+
+
+def observe_query(alias, seconds, sql=None):
+    """Record one database query (called by ``whoosh_api.db_backend``)."""
+    DB_QUERIES.labels(alias).inc()
+    counters = _request_db.get()
+    if counters is not None:
+        counters[0] += 1
+        counters[1] += seconds
+    calls = _request_calls.get()
+    if calls is not None:
+        calls.append(('sql', alias, sql, seconds))
+
+
+def _record_redis_call(args, seconds):
+    calls = _request_calls.get()
+    if calls is not None:
+        calls.append(('redis', None, _redis_statement(args), seconds))
+
+
+def _redis_statement(args):
+    # Command and key only: values may be tokens or other secrets
+    return ' '.join(str(arg) for arg in args[:2])
+
+
+def _pipeline_statement(command_stack):
+    return 'PIPELINE ' + ' '.join(_command_name(args) for args, _ in command_stack)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_VIEW
+    return match.view_name or UNRESOLVED_VIEW
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status and database usage of every request, labelled by
+    URL name. Place it first in ``MIDDLEWARE`` so the whole stack is timed.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started, token = self._start()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, started, token)
+
+    async def __acall__(self, request):
+        started, token = self._start()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, started, token)
+
+    def _start(self):
+        REQUESTS_IN_PROGRESS.inc()
+        return time.perf_counter(), _request_db.set([0, 0.0])
+
+    def _finish(self, request, response, started, token):
+        elapsed = time.perf_counter() - started
+        queries, db_seconds = _request_db.get()
+        _request_db.reset(token)
+        REQUESTS_IN_PROGRESS.dec()
+
+        view = _view_name(request)
+        status_code = str(response.status_code) if response is not None else '500'
+        method = request.method if request.method in HTTP_METHODS else 'other'
+        REQUEST_LATENCY.labels(view, method, status_code).observe(elapsed)
+        REQUEST_DB_QUERIES.labels(view).observe(queries)
+        REQUEST_DB_SECONDS.labels(view).observe(db_seconds)
+
+
+def _command_name(args):
+    return str(args[0]).upper() if args else 'UNKNOWN'
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        # execute() empties the stack, so describe it first when profiling
+        statement = _pipeline_statement(self.command_stack) if _request_calls.get() is not None else None
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        except redis.RedisError:
+            REDIS_ERRORS.labels('PIPELINE').inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            REDIS_COMMAND_SECONDS.labels('PIPELINE').observe(elapsed)
+            if statement is not None:
+                _request_calls.get().append(('redis', None, statement, elapsed))
+
+
+class InstrumentedRedis(redis.Redis):
+    """``redis.Redis`` that times every command and pipeline."""
+
+    def execute_command(self, *args, **options):
+        command = _command_name(args)
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        except redis.RedisError:
+            REDIS_ERRORS.labels(command).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            REDIS_COMMAND_SECONDS.labels(command).observe(elapsed)
+            _record_redis_call(args, elapsed)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedAsyncPipeline(redis.asyncio.client.Pipeline):
+    async def execute(self, raise_on_error=True):
+        # execute() empties the stack, so describe it first when profiling
+        statement = _pipeline_statement(self.command_stack) if _request_calls.get() is not None else None
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        except redis.RedisError:
+            REDIS_ERRORS.labels('PIPELINE').inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            REDIS_COMMAND_SECONDS.labels('PIPELINE').observe(elapsed)
+            if statement is not None:
+                _request_calls.get().append(('redis', None, statement, elapsed))
+
+
+class InstrumentedAsyncRedis(redis.asyncio.Redis):
+    """``redis.asyncio.Redis`` that times every command and pipeline."""
+
+    async def execute_command(self, *args, **options):
+        command = _command_name(args)
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except redis.RedisError:
+            REDIS_ERRORS.labels(command).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            REDIS_COMMAND_SECONDS.labels(command).observe(elapsed)
+            _record_redis_call(args, elapsed)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def observe_task(func):
+    """
+    Time a Celery task body. Apply below ``@shared_task``, so the web process
+    never imports Celery just to record metrics.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapped(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = 'failure'
+        try:
+            result = func(*args, **kwargs)
+            outcome = 'success'
+            return result
+        finally:
+            TASK_DURATION.labels(name, outcome).observe(time.perf_counter() - started)
+    return wrapped
+
+
+class MatchmakingQueueCollector:
+    """
+    Length of each queue in ``MATCHMAKING_QUEUES``, read from Redis at scrape
+    time with one pipelined ``LLEN`` per queue. The value is global, so it is
+    the same whichever pod is scraped.
+    """
+
+    def collect(self):
+        from .redis_client import get_redis
+
+        queues = settings.MATCHMAKING_QUEUES
+        if not queues:
+            return
+        family = GaugeMetricFamily(
+            'whoosh_matchmaking_queue_length', 'Players waiting in each matchmaking queue.', labels=['queue'],
+        )
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for queue in queues:
+                pipe.llen(f'matchmaking:queue:{queue}')
+            lengths = pipe.execute()
+        except redis.RedisError:
+            return
+        for queue, length in zip(queues, lengths):
+            family.add_metric([queue], length)
+        yield family
+
+
+def collect_registry():
+    """Registry to expose: all workers merged in multiprocess mode, else the default one."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        registry.register(_DefaultRegistryCollector())
+    registry.register(MatchmakingQueueCollector())
+    return registry
+
+
+class _DefaultRegistryCollector:
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. If ``METRICS_TOKEN`` is set, the scraper must
+    send it as a bearer token.
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(collect_registry()), content_type=CONTENT_TYPE_LATEST)
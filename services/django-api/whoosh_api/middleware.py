@@ -0,0 +1,112 @@
+"""
+Middleware for whoosh_api.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class BrowserOnlyMiddleware:
+    """
+    Run ``settings.BROWSER_MIDDLEWARE`` for pages, skip it for the API.
+
+    The API authenticates every request with a bearer JWT, so sessions, CSRF,
+    ``request.user`` from the session, messages and X-Frame-Options are only
+    needed by the frontend pages and the admin. Requests whose path starts with
+    one of ``settings.API_PATH_PREFIXES`` go straight to the view; everything
+    else passes through the browser middleware exactly as if it were listed in
+    ``MIDDLEWARE`` at this position, including its ``process_view`` hooks
+    (CSRF checks).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.api_prefixes = tuple(settings.API_PATH_PREFIXES)
+        self.async_mode = iscoroutinefunction(get_response)
+
+        view_hooks, template_response_hooks, exception_hooks = [], [], []
+        handler = get_response
+        for middleware_path in reversed(settings.BROWSER_MIDDLEWARE):
+            try:
+                middleware = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, 'process_view'):
+                view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                template_response_hooks.append(middleware.process_template_response)
+            if hasattr(middleware, 'process_exception'):
+                exception_hooks.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.browser_handler = handler
+        self.view_hooks = view_hooks
+        self.template_response_hooks = template_response_hooks
+        self.exception_hooks = exception_hooks
+
+        # Only expose the hooks the browser middleware actually has: Django
+        # calls every process_template_response for each DRF response, and
+        # under ASGI each sync hook costs a thread hop.
+        if view_hooks:
+            # Async under ASGI, so API requests skip it without a thread hop.
+            self.process_view = self._aprocess_view if self.async_mode else self._process_view
+        if template_response_hooks:
+            self.process_template_response = self._process_template_response
+        if exception_hooks:
+            self.process_exception = self._process_exception
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def is_api_request(self, request):
+        return request.path_info.startswith(self.api_prefixes)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if self.is_api_request(request):
+            return self.get_response(request)
+        return self.browser_handler(request)
+
+    async def __acall__(self, request):
+        if self.is_api_request(request):
+            return await self.get_response(request)
+        return await self.browser_handler(request)
+
+    def _process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_api_request(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_api_request(request):
+            return None
+        for hook in self.view_hooks:
+            if not iscoroutinefunction(hook):
+                hook = sync_to_async(hook, thread_sensitive=True)
+            response = await hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def _process_template_response(self, request, response):
+        if self.is_api_request(request):
+            return response
+        for hook in self.template_response_hooks:
+            response = hook(request, response)
+        return response
+
+    def _process_exception(self, request, exception):
+        if self.is_api_request(request):
+            return None
+        for hook in self.exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
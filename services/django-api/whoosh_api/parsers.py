@@ -0,0 +1,30 @@
+"""
+Fast JSON parser for the REST API.
+"""
+import io
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+
+class ORJSONParser(JSONParser):
+    """
+    Drop-in replacement for DRF's ``JSONParser`` backed by orjson.
+
+    Bodies orjson rejects (malformed JSON, non-UTF-8 charsets or integers wider
+    than 64 bits) are handed to the stdlib parser, so the accepted input and the
+    error messages stay exactly as before.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        body = stream.read()
+        if encoding.lower() in ('utf-8', 'utf8'):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,330 @@
+"""
+On-demand profiling of single requests.
+
+``ProfilingMiddleware`` profiles a request when it carries a valid
+``X-Whoosh-Profile`` header, or when ``PROFILING_SAMPLE_RATE`` picks it. The
+header value is minted by ``manage.py profiles token`` and signed with
+``SECRET_KEY``, so only operators can switch profiling on for a request. It
+expires after ``PROFILING_TOKEN_MAX_AGE`` seconds.
+
+A profiled request runs under cProfile while a sampler thread records its
+stack every ``PROFILING_STACK_INTERVAL_MS``, and its SQL and Redis calls are
+logged (see ``metrics._request_calls``). It is written to ``PROFILING_DIR``
+as three files:
+
+- ``<id>.prof``: pstats, for snakeviz or ``python -m pstats``;
+- ``<id>.folded``: sampled stacks, one ``frame;frame;frame count`` line per
+  stack, for flamegraph.pl or speedscope;
+- ``<id>.json``: the request, its timings and its calls.
+
+cProfile only keeps caller/callee pairs, which cannot be put back together
+into stacks through Django's recursive middleware chain; the sampled stacks
+are exact but miss anything shorter than the interval.
+
+The directory keeps only the newest ``PROFILING_MAX_PROFILES`` profiles.
+``manage.py profiles`` lists and exports them.
+
+With ``PROFILING_ENABLED`` off the middleware removes itself at startup, so
+requests do not pass through it at all.
+
+Under ASGI both run on the event loop thread. They then also see other
+requests' coroutines, but not code run in ``sync_to_async`` threads (SQL and
+Redis calls made there are still logged).
+"""
+import cProfile
+import collections
+import json
+import logging
+import os
+import pstats
+import random
+import secrets
+import sys
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_WHOOSH_PROFILE'
+PROFILE_ID_HEADER = 'X-Whoosh-Profile-Id'
+TOKEN_SALT = 'whoosh_api.profiling'
+PROFILE_SUFFIXES = ('.json', '.prof', '.folded')
+# Bounds on the call log of one profile
+MAX_CALLS = 1000
+MAX_STATEMENT_LENGTH = 2000
+
+# Threads running a profiler: cProfile has one hook per thread, so a second
+# profiled request on the same thread (ASGI) would clobber the first.
+_profiling_threads = set()
+
+
+def make_token(label):
+    """``X-Whoosh-Profile`` header value; ``label`` is saved with each profile it triggers."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(label)
+
+
+def _token_label(token):
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests asked for with a signed header or picked by sampling.
+    Place it right after ``MetricsMiddleware``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = self._begin(request)
+        if profile is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop()
+        return profile.save(request, response)
+
+    async def __acall__(self, request):
+        profile = self._begin(request)
+        if profile is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.stop()
+        return profile.save(request, response)
+
+    def _begin(self, request):
+        token = request.META.get(PROFILE_HEADER)
+        if token is not None:
+            label = _token_label(token)
+            if label is None:
+                logger.warning('Ignoring invalid or expired X-Whoosh-Profile header on %s', request.path)
+                trigger = None
+            else:
+                trigger = 'header'
+        else:
+            label = ''
+            trigger = 'sample' if self.sample_rate and random.random() < self.sample_rate else None
+        if trigger is None or threading.get_ident() in _profiling_threads:
+            return None
+        return RequestProfile(trigger, label)
+
+
+# Where sampled stacks start
+_MIDDLEWARE_CODES = (ProfilingMiddleware.__call__.__code__, ProfilingMiddleware.__acall__.__code__)
+
+
+class StackSampler(threading.Thread):
+    """Count the stacks of one thread, sampled every ``interval`` seconds until ``stop()``."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='whoosh-profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stopped = threading.Event()
+        self._names = {}
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            # Frames above the middleware (the server's loop) are the same in
+            # every sample; leave them out.
+            names = []
+            while frame is not None and frame.f_code not in _MIDDLEWARE_CODES:
+                names.append(self._frame_name(frame.f_code))
+                frame = frame.f_back
+            if self._stopped.is_set():
+                # Sampled the request thread stopping us, not the request
+                return
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def _frame_name(self, code):
+        name = self._names.get(code)
+        if name is None:
+            short = '/'.join(code.co_filename.split(os.sep)[-2:])
+            name = f'{code.co_qualname} ({short}:{code.co_firstlineno})'.replace(';', ',')
+            self._names[code] = name
+        return name
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.stacks.items()) if stack)
+
+
+class RequestProfile:
+    """Profiler, stack sampler and call log of one request, from construction to ``stop()``."""
+
+    def __init__(self, trigger, label):
+        self.trigger = trigger
+        self.label = label
+        self.thread = threading.get_ident()
+        self.calls = []
+        self.calls_token = metrics._request_calls.set(self.calls)
+        self.sampler = StackSampler(self.thread, settings.PROFILING_STACK_INTERVAL_MS / 1000)
+        self.profiler = cProfile.Profile()
+        _profiling_threads.add(self.thread)
+        self.sampler.start()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.sampler.stop()
+        self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.started
+        _profiling_threads.discard(self.thread)
+        metrics._request_calls.reset(self.calls_token)
+
+    def save(self, request, response):
+        """Write the profile unless it is a sample faster than ``PROFILING_SAMPLE_MIN_MS``."""
+        duration_ms = self.elapsed * 1000
+        if self.trigger == 'sample' and duration_ms < settings.PROFILING_SAMPLE_MIN_MS:
+            return response
+        try:
+            profile_id = write_profile(self.profiler, self.sampler.folded(), self.summary(request, response, duration_ms))
+        except OSError:
+            logger.exception('Could not write request profile to %s', settings.PROFILING_DIR)
+            return response
+        if self.trigger == 'header':
+            response[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    def summary(self, request, response, duration_ms):
+        totals = {'sql': [0, 0.0], 'redis': [0, 0.0]}
+        for kind, _, _, seconds in self.calls:
+            totals[kind][0] += 1
+            totals[kind][1] += seconds
+        return {
+            'created_at': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'view': metrics._view_name(request),
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'trigger': self.trigger,
+            'label': self.label,
+            'pid': os.getpid(),
+            'stack_samples': sum(self.sampler.stacks.values()),
+            'stack_interval_ms': settings.PROFILING_STACK_INTERVAL_MS,
+            'sql': {'count': totals['sql'][0], 'ms': round(totals['sql'][1] * 1000, 3)},
+            'redis': {'count': totals['redis'][0], 'ms': round(totals['redis'][1] * 1000, 3)},
+            'calls': [
+                {
+                    'kind': kind,
+                    'alias': alias,
+                    'statement': (statement or '')[:MAX_STATEMENT_LENGTH],
+                    'ms': round(seconds * 1000, 3),
+                }
+                for kind, alias, statement, seconds in self.calls[:MAX_CALLS]
+            ],
+        }
+
+
+def _new_profile_id():
+    # Sorts by creation time, which the ring buffer relies on
+    now = time.time()
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))
+    return f'{stamp}{int(now % 1 * 1000):03d}-{os.getpid()}-{secrets.token_hex(2)}'
+
+
+def _write_atomic(path, write):
+    temp_path = f'{path}.tmp'
+    write(temp_path)
+    os.replace(temp_path, path)
+
+
+def write_profile(profiler, folded, summary):
+    """Save a profile in ``PROFILING_DIR``, drop the oldest ones past the limit, and return its id."""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    profile_id = _new_profile_id()
+    summary = {'id': profile_id, **summary}
+
+    def write_folded(path):
+        with open(path, 'w') as f:
+            f.write(folded)
+
+    def write_summary(path):
+        with open(path, 'w') as f:
+            json.dump(summary, f)
+
+    # The .json is written last: listings only see complete profiles
+    _write_atomic(os.path.join(directory, f'{profile_id}.prof'), profiler.dump_stats)
+    _write_atomic(os.path.join(directory, f'{profile_id}.folded'), write_folded)
+    _write_atomic(os.path.join(directory, f'{profile_id}.json'), write_summary)
+    _prune(directory, settings.PROFILING_MAX_PROFILES)
+    return profile_id
+
+
+def _profile_ids(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len('.json')] for name in names if name.endswith('.json'))
+
+
+def _prune(directory, keep):
+    ids = _profile_ids(directory)
+    for profile_id in ids[:max(len(ids) - keep, 0)]:
+        for suffix in PROFILE_SUFFIXES:
+            try:
+                os.unlink(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                # Another worker pruned it first
+                pass
+
+
+def list_profiles(directory=None):
+    """Summaries of the saved profiles, newest first."""
+    directory = directory or settings.PROFILING_DIR
+    profiles = []
+    for profile_id in reversed(_profile_ids(directory)):
+        try:
+            profiles.append(load_profile(profile_id, directory))
+        except FileNotFoundError:
+            continue
+    return profiles
+
+
+def load_profile(profile_id, directory=None):
+    """The summary of one saved profile; raises ``FileNotFoundError`` if it is gone."""
+    with open(profile_path(profile_id, '.json', directory)) as f:
+        return json.load(f)
+
+
+def profile_path(profile_id, suffix, directory=None):
+    if os.sep in profile_id or profile_id.startswith('.'):
+        raise FileNotFoundError(profile_id)
+    return os.path.join(directory or settings.PROFILING_DIR, profile_id + suffix)
+
+
+def load_stats(profile_id, directory=None):
+    """The cProfile statistics of one saved profile as ``pstats.Stats``."""
+    return pstats.Stats(profile_path(profile_id, '.prof', directory))
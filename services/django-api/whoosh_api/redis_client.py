@@ -0,0 +1,49 @@
+"""
+Shared Redis client for whoosh_api.
+"""
+import asyncio
+import weakref
+from django.conf import settings
+from .metrics import InstrumentedAsyncRedis, InstrumentedRedis
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_redis():
+    """
+    Return the process-wide Redis client.
+
+    The client owns a single connection pool per process; redis-py resets the
+    pool automatically after a fork, so this is safe under gunicorn workers.
+    Commands are timed in ``whoosh_redis_command_duration_seconds``.
+    """
+    global _client
+    if _client is None:
+        _client = InstrumentedRedis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=True
+        )
+    return _client
+
+
+def get_async_redis():
+    """
+    Return the ``redis.asyncio`` client for the running event loop.
+
+    asyncio connections are bound to the loop that opened them, so one client
+    is kept per loop. Under uvicorn that is one client per worker process.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = InstrumentedAsyncRedis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=True
+        )
+        _async_clients[loop] = client
+    return client
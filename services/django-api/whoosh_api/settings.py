@@ -2,6 +2,7 @@
 Django settings for whoosh_api project.
 """
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -36,26 +37,43 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'apps.core',
     'apps.auth',
     'apps.users',
     'apps.matchmaking',
     'apps.game',
+    'apps.economy',
+    'apps.seasons',
 ]
 
 MIDDLEWARE = [
+    'whoosh_api.metrics.MetricsMiddleware',  # First, so it times the whole stack
+    'whoosh_api.profiling.ProfilingMiddleware',  # Removes itself unless PROFILING_ENABLED
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Must be after SecurityMiddleware
     'corsheaders.middleware.CorsMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'whoosh_api.middleware.BrowserOnlyMiddleware',  # Runs BROWSER_MIDDLEWARE except for API paths
+]
+
+# Middleware only the frontend pages and the admin need. API requests
+# (API_PATH_PREFIXES) authenticate with bearer JWTs and skip it.
+BROWSER_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+API_PATH_PREFIXES = ('/api/', '/metrics', '/.well-known/')
+
+# The admin's middleware checks only look at MIDDLEWARE; sessions, auth and
+# messages are in BROWSER_MIDDLEWARE, which covers /admin/.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'whoosh_api.urls'
 
@@ -76,19 +94,99 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'whoosh_api.wsgi.application'
+ASGI_APPLICATION = 'whoosh_api.asgi.application'
+
+# Prometheus scrape endpoint (/metrics). When set, scrapers must send
+# "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# On-demand request profiling (whoosh_api.profiling). Requests are profiled
+# when they carry an X-Whoosh-Profile header from "manage.py profiles token",
+# or at PROFILING_SAMPLE_RATE; sampled profiles faster than
+# PROFILING_SAMPLE_MIN_MS are dropped. PROFILING_DIR keeps the newest
+# PROFILING_MAX_PROFILES. Stacks for flamegraphs are sampled every
+# PROFILING_STACK_INTERVAL_MS. Disabled, the middleware is not even loaded.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_SAMPLE_MIN_MS = float(os.getenv('PROFILING_SAMPLE_MIN_MS', '0'))
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'whoosh-profiles'))
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', '100'))
+PROFILING_STACK_INTERVAL_MS = float(os.getenv('PROFILING_STACK_INTERVAL_MS', '5'))
+PROFILING_TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', '3600'))
+
+# Server mode: 'wsgi' (gunicorn gthread) or 'asgi' (gunicorn + uvicorn workers).
+# In ASGI mode the Redis-bound endpoints are routed to native async views.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+ASYNC_VIEWS = SERVER_MODE == 'asgi'
+# Requests in flight per uvicorn worker (whoosh_api.workers; read there from
+# the environment too)
+ASGI_MAX_CONCURRENCY = int(os.getenv('ASGI_MAX_CONCURRENCY', '100'))
 
 # Database
+# Connections are persistent: each worker thread keeps its connection for
+# DB_CONN_MAX_AGE seconds and checks it before reuse, instead of paying a
+# TLS connect to Aurora on every request. Setting DB_POOL_MAX_SIZE switches to
+# a psycopg pool per worker process instead (Django 5.1+, psycopg[pool]).
+# In ASGI mode without a pool connections close after each request: every
+# request runs its sync code on a new thread, so a persistent connection
+# would never be reused.
+# Check the fleet-wide total with `python manage.py db_budget`.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'whoosh_api.db_backend',
         'NAME': os.getenv('DB_NAME', 'whoosh'),
         'USER': os.getenv('DB_USER', 'postgres'),
         'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if ASYNC_VIEWS else int(os.getenv('DB_CONN_MAX_AGE', '300')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+        },
     }
 }
 
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '0'))
+if DB_POOL_MAX_SIZE:
+    import django
+    from django.core.exceptions import ImproperlyConfigured
+
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured('DB_POOL_MAX_SIZE requires Django 5.1+ (OPTIONS["pool"])')
+    # Pooled connections are returned to the pool at the end of each request,
+    # so persistent connections must be off.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+        'max_size': DB_POOL_MAX_SIZE,
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    }
+
+# Aurora reader endpoint. Views decorated with whoosh_api.db_router.replica_reads
+# read from it; users who just wrote stay on the writer for
+# DB_REPLICA_PIN_SECONDS, and all reads fall back to the writer while replica
+# lag exceeds DB_REPLICA_MAX_LAG_SECONDS.
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+if DB_REPLICA_HOST:
+    import copy
+
+    DATABASES['replica'] = copy.deepcopy(DATABASES['default'])
+    DATABASES['replica']['HOST'] = DB_REPLICA_HOST
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['whoosh_api.db_router.ReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '10'))
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '1.0'))
+DB_REPLICA_LAG_CHECK_SECONDS = float(os.getenv('DB_REPLICA_LAG_CHECK_SECONDS', '5'))
+# Aurora reports lag for every reader; on plain PostgreSQL streaming replicas use
+# "SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())".
+DB_REPLICA_LAG_QUERY = os.getenv(
+    'DB_REPLICA_LAG_QUERY',
+    "SELECT COALESCE(MAX(replica_lag_in_msec), 0) / 1000.0 FROM aurora_replica_status() "
+    "WHERE session_id <> 'MASTER_SESSION_ID'",
+)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -127,6 +225,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'whoosh_api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'whoosh_api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -144,12 +251,39 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Local development: sign with a key pair kept in JWT_DEV_KEY_FILE when
+# Secrets Manager is unreachable. Off (the default outside DEBUG), a failed
+# fetch stops start-up instead, so a pod never signs with, or publishes in
+# its JWKS, a key no other pod has.
+JWT_DEV_KEYS = os.getenv('JWT_DEV_KEYS', str(DEBUG)).lower() == 'true'
+JWT_DEV_KEY_FILE = os.getenv('JWT_DEV_KEY_FILE', os.path.join(tempfile.gettempdir(), 'whoosh-jwt-dev-key.pem'))
+# How long verifiers may cache /.well-known/jwks.json
+JWKS_MAX_AGE = int(os.getenv('JWKS_MAX_AGE', '21600'))
+
 # Redis Configuration
 REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
 REDIS_DB = int(os.getenv('REDIS_DB', '0'))
 REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
 
+# Public profile cache (lobby rendering, batch lookups)
+USER_PROFILE_CACHE_TTL = int(os.getenv('USER_PROFILE_CACHE_TTL', '300'))
+USER_BATCH_MAX_IDS = int(os.getenv('USER_BATCH_MAX_IDS', '100'))
+
+# Player search (apps.users.search): results per query and how long they are cached
+USER_SEARCH_MAX_RESULTS = int(os.getenv('USER_SEARCH_MAX_RESULTS', '20'))
+USER_SEARCH_CACHE_TTL = int(os.getenv('USER_SEARCH_CACHE_TTL', '30'))
+
+# Shared secret game servers send as "Authorization: Bearer <GAME_SERVER_TOKEN>"
+# when posting match results. Unset, every result is refused.
+GAME_SERVER_TOKEN = os.getenv('GAME_SERVER_TOKEN', '')
+
+# Matchmaking queues whose length /metrics reports
+MATCHMAKING_QUEUES = tuple(filter(None, os.getenv('MATCHMAKING_QUEUES', 'standard').split(',')))
+
+# Matchmaking: signed tickets the game edge verifies offline on join
+MATCH_TICKET_LIFETIME = int(os.getenv('MATCH_TICKET_LIFETIME', '120'))
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'sqs://')
 CELERY_RESULT_BACKEND = REDIS_URL
@@ -158,6 +292,42 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Season rollover (apps.seasons.rollover). The soft reset moves every rating
+# toward SEASON_RESET_TARGET_ELO, keeping SEASON_RESET_KEEP of its distance.
+SEASON_RESET_TARGET_ELO = int(os.getenv('SEASON_RESET_TARGET_ELO', '1000'))
+SEASON_RESET_KEEP = float(os.getenv('SEASON_RESET_KEEP', '0.5'))
+SEASON_ROLLOVER_BATCH_SIZE = int(os.getenv('SEASON_ROLLOVER_BATCH_SIZE', '5000'))
+SEASON_ROLLOVER_SLEEP_SECONDS = float(os.getenv('SEASON_ROLLOVER_SLEEP_SECONDS', '0.05'))
+SEASON_ROLLOVER_TIME_BUDGET = float(os.getenv('SEASON_ROLLOVER_TIME_BUDGET', '240'))
+
+# Expired guest cleanup (apps.users.tasks.cleanup_expired_guests)
+GUEST_CLEANUP_BATCH_SIZE = int(os.getenv('GUEST_CLEANUP_BATCH_SIZE', '1000'))
+GUEST_CLEANUP_SLEEP_SECONDS = float(os.getenv('GUEST_CLEANUP_SLEEP_SECONDS', '0.1'))
+GUEST_CLEANUP_TIME_BUDGET = float(os.getenv('GUEST_CLEANUP_TIME_BUDGET', '240'))
+
+# Admin changelists on large tables (apps.core.admin): filtered results are
+# counted up to ADMIN_COUNT_LIMIT rows; bulk actions work in chunks.
+ADMIN_COUNT_LIMIT = int(os.getenv('ADMIN_COUNT_LIMIT', '10000'))
+ADMIN_ACTION_BATCH_SIZE = int(os.getenv('ADMIN_ACTION_BATCH_SIZE', '1000'))
+
+# Analytics export (apps.core.export): rows per server-side cursor fetch, and
+# how far behind now the default "until" watermark stops. Keep the lag above
+# the longest transaction that writes exported rows plus replica lag.
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+EXPORT_WATERMARK_LAG_SECONDS = int(os.getenv('EXPORT_WATERMARK_LAG_SECONDS', '60'))
+
+# Economy ledger (apps.economy)
+ECONOMY_CURRENCIES = tuple(os.getenv('ECONOMY_CURRENCIES', 'coins,gems').split(','))
+ECONOMY_DEFAULT_CURRENCY = ECONOMY_CURRENCIES[0]
+ECONOMY_BALANCE_TTL = int(os.getenv('ECONOMY_BALANCE_TTL', '86400'))
+ECONOMY_MATCH_REWARD = int(os.getenv('ECONOMY_MATCH_REWARD', '10'))
+ECONOMY_WIN_BONUS = int(os.getenv('ECONOMY_WIN_BONUS', '25'))
+# Ledger rows younger than this are not folded into snapshots yet; keep it
+# above the longest transaction that writes the ledger.
+ECONOMY_SNAPSHOT_LAG_SECONDS = int(os.getenv('ECONOMY_SNAPSHOT_LAG_SECONDS', '60'))
+ECONOMY_RECONCILE_BATCH_SIZE = int(os.getenv('ECONOMY_RECONCILE_BATCH_SIZE', '5000'))
+ECONOMY_RECONCILE_TIME_BUDGET = float(os.getenv('ECONOMY_RECONCILE_TIME_BUDGET', '50'))
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', '').split(',') if os.getenv('CORS_ALLOWED_ORIGINS') else []
 CORS_ALLOW_CREDENTIALS = True
@@ -0,0 +1,39 @@
+"""
+Process start-up hooks that front-load work out of the request path.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def preload():
+    """
+    Import every URLconf, and with it every view module.
+
+    Runs when ``whoosh_api.wsgi``/``whoosh_api.asgi`` is imported. Under
+    ``gunicorn --preload`` that happens once in the master, so workers fork
+    with it already done, copy-on-write. It makes no network calls, so
+    ``manage.py importtime`` measures exactly this; the JWT keys are fetched
+    separately, in gunicorn's ``when_ready`` hook.
+    """
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+
+
+def warm_up_worker():
+    """
+    Ping Redis before this worker takes traffic.
+
+    Runs in each worker after the fork (gunicorn ``post_worker_init``), since
+    connections must not be shared across a fork. The Redis pool is
+    process-wide, so the ping leaves a ready connection behind for the first
+    request. Database connections belong to the thread that opens them, so
+    none is opened here; no request thread could use it.
+    """
+    from whoosh_api.redis_client import get_redis
+
+    try:
+        get_redis().ping()
+    except Exception:
+        logger.exception('Redis warm-up failed')
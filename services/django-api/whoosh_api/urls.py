@@ -6,7 +6,9 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from apps.auth import views as auth_views
+from apps.core import views as core_views
 from . import views
+from .metrics import metrics_view
 
 urlpatterns = [
     path('', views.index, name='index'),  # Frontend app at root
@@ -16,7 +18,12 @@ urlpatterns = [
     path('api/users/', include('apps.users.urls')),
     path('api/match/', include('apps.matchmaking.urls')),
     path('api/game/', include('apps.game.urls')),
+    path('api/economy/', include('apps.economy.urls')),
     path('api/health/', auth_views.health_check, name='health'),  # Health check endpoint
+    path('api/health/db/', core_views.db_health, name='health-db'),  # Connection stats for this worker
+    path('api/export/<str:table>/', core_views.export_table, name='export-table'),  # Analytics export (staff only)
+    path('.well-known/jwks.json', auth_views.jwks, name='jwks'),  # JWT verification keys for other services
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape endpoint
 ]
 
 # WhiteNoise handles static files in production, so we don't need this
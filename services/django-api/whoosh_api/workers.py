@@ -0,0 +1,18 @@
+"""
+Gunicorn worker classes.
+"""
+import os
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """
+    Uvicorn worker that answers 503 beyond ``ASGI_MAX_CONCURRENCY`` requests
+    in flight. Django runs each request's sync code on a thread of its own,
+    so this is also the most database connections one worker can hold per
+    alias (see ``apps.core.connections``).
+    """
+    CONFIG_KWARGS = {
+        **BaseUvicornWorker.CONFIG_KWARGS,
+        'limit_concurrency': int(os.getenv('ASGI_MAX_CONCURRENCY', '100')),
+    }
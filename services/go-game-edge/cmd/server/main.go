@@ -15,6 +15,7 @@ import (
 	"syscall"
 	"time"
 
+	"github.com/whooshgames/whoosh/go-game-edge/internal/auth"
 	"github.com/whooshgames/whoosh/go-game-edge/internal/game"
 	"github.com/whooshgames/whoosh/go-game-edge/internal/redis"
 	"github.com/whooshgames/whoosh/go-game-edge/internal/websocket"
@@ -25,6 +26,8 @@ var (
 	redisAddr     = flag.String("redis-addr", "localhost:6379", "Redis address")
 	redisPassword = flag.String("redis-password", "", "Redis password")
 	jwtPublicKey  = flag.String("jwt-public-key", "", "JWT public key (PEM format)")
+	jwksURL       = flag.String("jwks-url", "", "JWKS URL of the Django API; takes precedence over -jwt-public-key")
+	requireTicket = flag.Bool("require-match-ticket", false, "Reject game joins without a signed match ticket")
 )
 
 func main() {
@@ -40,9 +43,15 @@ func main() {
 	if envJWTKey := os.Getenv("JWT_PUBLIC_KEY"); envJWTKey != "" {
 		*jwtPublicKey = envJWTKey
 	}
+	if envJWKSURL := os.Getenv("JWKS_URL"); envJWKSURL != "" {
+		*jwksURL = envJWKSURL
+	}
 	if envPort := os.Getenv("PORT"); envPort != "" {
 		*port = envPort
 	}
+	if envRequireTicket := os.Getenv("REQUIRE_MATCH_TICKET"); envRequireTicket != "" {
+		*requireTicket = envRequireTicket == "true" || envRequireTicket == "1"
+	}
 
 	// Log connection details (without password)
 	log.Printf("Connecting to Redis at: %s (password: %s)", *redisAddr, func() string {
@@ -111,9 +120,21 @@ func main() {
 		log.Fatalf("Failed to connect to Redis after 5 attempts: %v", err)
 	}
 
-	// Load JWT public key (optional - service can work without it for testing)
-	var pubKey *rsa.PublicKey
-	if *jwtPublicKey != "" {
+	// Load JWT verification keys (optional - service can work without them for testing)
+	var pubKey interface{}
+	if *jwksURL != "" {
+		// Keys by kid from the API; rotations are picked up without a restart
+		keySet := auth.NewKeySet(*jwksURL)
+		ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
+		if err := keySet.Refresh(ctx); err != nil {
+			log.Printf("Warning: Failed to load JWKS from %s: %v - retrying on first token", *jwksURL, err)
+		} else {
+			log.Printf("JWKS loaded from %s", *jwksURL)
+		}
+		cancel()
+		go keySet.Run(context.Background(), time.Hour)
+		pubKey = keySet
+	} else if *jwtPublicKey != "" {
 		block, _ := pem.Decode([]byte(*jwtPublicKey))
 		if block == nil {
 			log.Printf("Warning: Failed to decode JWT public key - JWT validation will be disabled")
@@ -131,7 +152,7 @@ func main() {
 	}
 
 	// Initialize game manager
-	gameManager := game.NewManager(redisClient, pubKey)
+	gameManager := game.NewManager(redisClient, pubKey, *requireTicket)
 
 	// Setup HTTP server
 	mux := http.NewServeMux()
@@ -0,0 +1,176 @@
+package auth
+
+import (
+	"context"
+	"crypto/rsa"
+	"encoding/base64"
+	"encoding/json"
+	"errors"
+	"fmt"
+	"log"
+	"math/big"
+	"net/http"
+	"sync"
+	"time"
+)
+
+// minRefetchInterval limits refetches triggered by tokens with an unknown kid
+const minRefetchInterval = 30 * time.Second
+
+// KeySet holds the RSA verification keys published by the Django API at
+// /.well-known/jwks.json, by kid. Keys are refreshed periodically and when a
+// token names a kid that is not in the set yet (a key rotation).
+type KeySet struct {
+	url    string
+	client *http.Client
+
+	mu        sync.RWMutex
+	keys      map[string]*rsa.PublicKey
+	current   string // kid of the first (signing) key
+	fetchedAt time.Time
+	fetchMux  sync.Mutex
+}
+
+type jwk struct {
+	Kty string `json:"kty"`
+	Kid string `json:"kid"`
+	N   string `json:"n"`
+	E   string `json:"e"`
+}
+
+// NewKeySet creates a key set for a JWKS URL; call Refresh to load it
+func NewKeySet(url string) *KeySet {
+	return &KeySet{
+		url:    url,
+		client: &http.Client{Timeout: 5 * time.Second},
+		keys:   make(map[string]*rsa.PublicKey),
+	}
+}
+
+// Refresh fetches the JWKS document and replaces the keys
+func (s *KeySet) Refresh(ctx context.Context) error {
+	s.fetchMux.Lock()
+	defer s.fetchMux.Unlock()
+	return s.fetch(ctx)
+}
+
+func (s *KeySet) fetch(ctx context.Context) error {
+	req, err := http.NewRequestWithContext(ctx, http.MethodGet, s.url, nil)
+	if err != nil {
+		return err
+	}
+	resp, err := s.client.Do(req)
+	if err != nil {
+		return fmt.Errorf("fetch JWKS: %w", err)
+	}
+	defer resp.Body.Close()
+	if resp.StatusCode != http.StatusOK {
+		return fmt.Errorf("fetch JWKS: status %d", resp.StatusCode)
+	}
+
+	var doc struct {
+		Keys []jwk `json:"keys"`
+	}
+	if err := json.NewDecoder(resp.Body).Decode(&doc); err != nil {
+		return fmt.Errorf("decode JWKS: %w", err)
+	}
+
+	keys := make(map[string]*rsa.PublicKey, len(doc.Keys))
+	current := ""
+	for _, k := range doc.Keys {
+		if k.Kty != "RSA" || k.Kid == "" {
+			continue
+		}
+		pub, err := parseRSAKey(k)
+		if err != nil {
+			log.Printf("Skipping JWKS key %s: %v", k.Kid, err)
+			continue
+		}
+		keys[k.Kid] = pub
+		if current == "" {
+			current = k.Kid
+		}
+	}
+	if len(keys) == 0 {
+		return errors.New("JWKS has no usable RSA keys")
+	}
+
+	s.mu.Lock()
+	s.keys = keys
+	s.current = current
+	s.fetchedAt = time.Now()
+	s.mu.Unlock()
+	return nil
+}
+
+func parseRSAKey(k jwk) (*rsa.PublicKey, error) {
+	n, err := base64.RawURLEncoding.DecodeString(k.N)
+	if err != nil {
+		return nil, fmt.Errorf("modulus: %w", err)
+	}
+	e, err := base64.RawURLEncoding.DecodeString(k.E)
+	if err != nil {
+		return nil, fmt.Errorf("exponent: %w", err)
+	}
+	exponent := new(big.Int).SetBytes(e)
+	if !exponent.IsInt64() || exponent.Int64() > 1<<31-1 {
+		return nil, errors.New("exponent too large")
+	}
+	return &rsa.PublicKey{N: new(big.Int).SetBytes(n), E: int(exponent.Int64())}, nil
+}
+
+// Key returns the verification key for kid. An empty kid (tokens signed
+// before key ids existed) means the current key. An unknown kid triggers a
+// refetch, at most once per minRefetchInterval.
+func (s *KeySet) Key(kid string) (*rsa.PublicKey, error) {
+	if key, ok := s.lookup(kid); ok {
+		return key, nil
+	}
+
+	s.fetchMux.Lock()
+	defer s.fetchMux.Unlock()
+	// Another request may have refetched while we waited
+	if key, ok := s.lookup(kid); ok {
+		return key, nil
+	}
+	s.mu.RLock()
+	recent := time.Since(s.fetchedAt) < minRefetchInterval
+	s.mu.RUnlock()
+	if !recent {
+		ctx, cancel := context.WithTimeout(context.Background(), 5*time.Second)
+		defer cancel()
+		if err := s.fetch(ctx); err != nil {
+			log.Printf("JWKS refetch failed: %v", err)
+		}
+		if key, ok := s.lookup(kid); ok {
+			return key, nil
+		}
+	}
+	return nil, fmt.Errorf("unknown key id %q", kid)
+}
+
+func (s *KeySet) lookup(kid string) (*rsa.PublicKey, bool) {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+	if kid == "" {
+		kid = s.current
+	}
+	key, ok := s.keys[kid]
+	return key, ok
+}
+
+// Run refreshes the key set every interval until ctx is done
+func (s *KeySet) Run(ctx context.Context, interval time.Duration) {
+	ticker := time.NewTicker(interval)
+	defer ticker.Stop()
+	for {
+		select {
+		case <-ctx.Done():
+			return
+		case <-ticker.C:
+			if err := s.Refresh(ctx); err != nil {
+				log.Printf("JWKS refresh failed: %v", err)
+			}
+		}
+	}
+}
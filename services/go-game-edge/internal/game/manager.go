@@ -12,15 +12,18 @@ type Manager struct {
 	lobbies    map[string]*Lobby
 	lobbiesMux sync.RWMutex
 	redis      *redis.Client
-	jwtPubKey  interface{} // *rsa.PublicKey
+	jwtPubKey  interface{} // *rsa.PublicKey or *auth.KeySet
+	// requireTicket rejects joins without a signed match ticket
+	requireTicket bool
 }
 
 // NewManager creates a new game manager
-func NewManager(redisClient *redis.Client, jwtPubKey interface{}) *Manager {
+func NewManager(redisClient *redis.Client, jwtPubKey interface{}, requireTicket bool) *Manager {
 	return &Manager{
-		lobbies:   make(map[string]*Lobby),
-		redis:     redisClient,
-		jwtPubKey: jwtPubKey,
+		lobbies:       make(map[string]*Lobby),
+		redis:         redisClient,
+		jwtPubKey:     jwtPubKey,
+		requireTicket: requireTicket,
 	}
 }
 
@@ -74,3 +77,7 @@ func (m *Manager) GetJWTPublicKey() interface{} {
 	return m.jwtPubKey
 }
 
+// RequireMatchTicket reports whether joining a game requires a match ticket
+func (m *Manager) RequireMatchTicket() bool {
+	return m.requireTicket
+}
@@ -14,6 +14,9 @@ import (
 	"github.com/whooshgames/whoosh/go-game-edge/internal/game"
 )
 
+// matchTicketType is the token_type claim of tickets issued by the Django matchmaker
+const matchTicketType = "match_ticket"
+
 var upgrader = websocket.Upgrader{
 	ReadBufferSize:  1024,
 	WriteBufferSize: 1024,
@@ -54,6 +57,19 @@ func HandleWebSocket(gameManager *game.Manager) http.HandlerFunc {
 			return
 		}
 
+		// The match ticket from /api/match/assignment/ proves the player was
+		// placed in this game; it is verified offline, without reading Redis
+		if ticket := r.URL.Query().Get("ticket"); ticket != "" {
+			if err := validateMatchTicket(ticket, gameManager.GetJWTPublicKey(), userID, gameID); err != nil {
+				log.Printf("Match ticket validation error: %v", err)
+				http.Error(w, "Invalid match ticket", http.StatusForbidden)
+				return
+			}
+		} else if gameManager.RequireMatchTicket() {
+			http.Error(w, "Missing match ticket", http.StatusForbidden)
+			return
+		}
+
 		// Upgrade connection
 		conn, err := upgrader.Upgrade(w, r, nil)
 		if err != nil {
@@ -82,15 +98,15 @@ func HandleWebSocket(gameManager *game.Manager) http.HandlerFunc {
 	}
 }
 
-// validateJWT validates JWT token and returns userID, isGuest, displayName
-func validateJWT(tokenString string, pubKey interface{}) (userID string, isGuest bool, displayName string, err error) {
-	if pubKey == nil {
-		return "", false, "", errors.New("JWT public key not configured")
-	}
+// keyResolver looks verification keys up by kid (see auth.KeySet)
+type keyResolver interface {
+	Key(kid string) (*rsa.PublicKey, error)
+}
 
-	rsaPubKey, ok := pubKey.(*rsa.PublicKey)
-	if !ok {
-		return "", false, "", errors.New("invalid public key type")
+// parseRS256 verifies an RS256 token signed by the Django API and returns its claims
+func parseRS256(tokenString string, pubKey interface{}) (jwt.MapClaims, error) {
+	if pubKey == nil {
+		return nil, errors.New("JWT public key not configured")
 	}
 
 	// Parse and validate token
@@ -99,21 +115,61 @@ func validateJWT(tokenString string, pubKey interface{}) (userID string, isGuest
 		if _, ok := token.Method.(*jwt.SigningMethodRSA); !ok {
 			return nil, fmt.Errorf("unexpected signing method: %v", token.Header["alg"])
 		}
-		return rsaPubKey, nil
+		switch key := pubKey.(type) {
+		case *rsa.PublicKey:
+			return key, nil
+		case keyResolver:
+			kid, _ := token.Header["kid"].(string)
+			return key.Key(kid)
+		default:
+			return nil, errors.New("invalid public key type")
+		}
 	}, jwt.WithValidMethods([]string{"RS256"}))
 
 	if err != nil {
-		return "", false, "", fmt.Errorf("failed to parse token: %w", err)
+		return nil, fmt.Errorf("failed to parse token: %w", err)
 	}
 
 	if !token.Valid {
-		return "", false, "", errors.New("invalid token")
+		return nil, errors.New("invalid token")
 	}
 
 	// Extract claims
 	claims, ok := token.Claims.(jwt.MapClaims)
 	if !ok {
-		return "", false, "", errors.New("invalid token claims")
+		return nil, errors.New("invalid token claims")
+	}
+	return claims, nil
+}
+
+// validateMatchTicket checks that a match ticket was issued to userID for gameID
+func validateMatchTicket(ticketString string, pubKey interface{}, userID, gameID string) error {
+	claims, err := parseRS256(ticketString, pubKey)
+	if err != nil {
+		return err
+	}
+	if claims["token_type"] != matchTicketType {
+		return errors.New("not a match ticket")
+	}
+	if fmt.Sprintf("%v", claims["user_id"]) != userID {
+		return errors.New("match ticket issued to another user")
+	}
+	if fmt.Sprintf("%v", claims["game_id"]) != gameID {
+		return errors.New("match ticket issued for another game")
+	}
+	return nil
+}
+
+// validateJWT validates JWT token and returns userID, isGuest, displayName
+func validateJWT(tokenString string, pubKey interface{}) (userID string, isGuest bool, displayName string, err error) {
+	claims, err := parseRS256(tokenString, pubKey)
+	if err != nil {
+		return "", false, "", err
+	}
+
+	// Match tickets share the signing key but are not access tokens
+	if claims["token_type"] == matchTicketType {
+		return "", false, "", errors.New("match ticket used as access token")
 	}
 
 	// Extract user_id